@@ -0,0 +1,97 @@
+"""
+Process-level materialized view of active orders.
+
+The active set is small, so each worker keeps it in memory, serialized, and
+serves /admin/orders from it. Every order write bumps a per-outlet change
+counter right after it commits, in a separate short transaction, so writers
+never hold the counter's row lock for their whole transaction. Writes made by
+this process are applied to the view directly; a counter value the view has
+not seen, or a gap in the sequence, means another worker wrote, and the view
+is reloaded on the next read. A write is therefore visible to other workers
+once its counter bump lands, moments after its commit.
+"""
+import threading
+
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Order, OrderItem, ChangeCounter
+
+
+def orders_counter(outlet_id):
+    """Name of the change counter bumped on every order write of an outlet"""
+    return f'orders:{outlet_id}'
+
+
+class ActiveOrdersView:
+    """Active (not fully delivered) orders of one outlet, kept in memory"""
+
+    def __init__(self, outlet_id):
+        self.outlet_id = outlet_id
+        self._lock = threading.Lock()
+        self._orders = {}  # order_id -> serialized order
+        self._version = None
+        self._json = None
+
+    def _load(self, version):
+        undelivered = OrderItem.query.filter(or_(
+            OrderItem.delivered_full < OrderItem.full_qty,
+            OrderItem.delivered_half < OrderItem.half_qty
+        )).with_entities(OrderItem.order_id)
+        orders = (
+            Order.query
+            .filter(Order.outlet_id == self.outlet_id)
+            .filter(or_(Order.id.in_(undelivered), ~Order.order_items.any()))
+            .options(
+                selectinload(Order.order_items).joinedload(OrderItem.menu_item),
+                joinedload(Order.merchant_account)
+            )
+            .all()
+        )
+        self._orders = {order.id: order.to_dict() for order in orders}
+        self._version = version
+        self._json = None
+
+    def read_json(self):
+        """Active orders, newest first, as encoded JSON"""
+        version = ChangeCounter.current(orders_counter(self.outlet_id))
+        with self._lock:
+            if version != self._version:
+                self._load(version)
+            if self._json is None:
+                # Sort by timestamp (newest first)
+                orders = sorted(
+                    self._orders.values(),
+                    key=lambda order: (order['timestamp'], order['id']),
+                    reverse=True
+                )
+                self._json = current_app.json.dumps(orders)
+            return self._json
+
+    def orders_written(self, orders, version):
+        """Apply orders committed by this process under counter value `version`"""
+        with self._lock:
+            if self._version is None or version != self._version + 1:
+                # Not loaded yet, or another worker wrote in between
+                self._version = None
+                return
+            for order in orders:
+                if order.is_fully_delivered():
+                    self._orders.pop(order.id, None)
+                else:
+                    self._orders[order.id] = order.to_dict()
+            self._version = version
+            self._json = None
+
+
+_views = {}
+_views_lock = threading.Lock()
+
+
+def active_orders_view(outlet_id):
+    """Active-orders view for an outlet"""
+    with _views_lock:
+        if outlet_id not in _views:
+            _views[outlet_id] = ActiveOrdersView(outlet_id)
+        return _views[outlet_id]
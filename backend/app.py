@@ -12,21 +12,31 @@ sys.path.insert(0, backend_dir)
 from models import db
 from config import Config
 from routes import public_bp, admin_bp
+from outlets import OutletPathMiddleware, resolve_outlet, init_outlets
+from responses import init_responses
 from seed_data import seed_database
+from universal_items import seed_catalog
 
-def create_app():
-    """Create and configure Flask application"""
+def create_app(config=None):
+    """Create and configure Flask application; `config` overrides settings (tests)"""
     # Serve React build in production
     frontend_dist = Path(__file__).parent.parent / 'frontend' / 'dist'
     app = Flask(__name__, static_folder=str(frontend_dist), static_url_path='')
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
 
     # Initialize extensions
     db.init_app(app)
+    init_responses(app)
     # Only enable CORS in development
     if app.config.get('ENV', 'production') == 'development':
         CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
 
+    # Resolve the outlet once per request, from /o/<slug> or the host
+    app.wsgi_app = OutletPathMiddleware(app.wsgi_app)
+    app.before_request(resolve_outlet)
+
     # Register blueprints (API routes)
     app.register_blueprint(public_bp)
     app.register_blueprint(admin_bp)
@@ -46,9 +56,12 @@ def create_app():
     with app.app_context():
         db.create_all()
         # Seed database if empty
-        from models import MenuItem
+        from models import MenuItem, CatalogItem
         if MenuItem.query.count() == 0:
             seed_database()
+        elif CatalogItem.query.count() == 0:
+            seed_catalog()
+        init_outlets(app)
 
     return app
 
@@ -1,10 +1,58 @@
 import os
 
+
+def database_url(url):
+    """Normalize a database URL (hosting providers still hand out postgres://)"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """Engine options for a database URL, tuned per backend"""
+    if url.startswith('postgresql'):
+        return {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            # Drop connections the server closed while idle instead of failing a request
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+        }
+    return {}
+
+
 class Config:
     """Application configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///momo_orders.db'
+    SQLALCHEMY_DATABASE_URI = database_url(os.environ.get('DATABASE_URL') or 'sqlite:///momo_orders.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Outlets with their own database, e.g. "campus=sqlite:///campus.db,mall=sqlite:///mall.db"
+    OUTLET_DATABASES = {
+        slug: database_url(url) for slug, url in (
+            entry.strip().split('=', 1)
+            for entry in os.environ.get('OUTLET_DATABASES', '').split(',') if '=' in entry
+        )
+    }
+    SQLALCHEMY_BINDS = {
+        f'outlet:{slug}': {'url': url, **engine_options(url)}
+        for slug, url in OUTLET_DATABASES.items()
+    }
+    # Rows fetched per round-trip when streaming the Excel export
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+    # JSON responses at least this many bytes are gzipped for clients that accept it
+    GZIP_MIN_SIZE = int(os.environ.get('GZIP_MIN_SIZE', 1024))
+    GZIP_LEVEL = 5
+    # Idempotency-Key responses are kept this many seconds, and at most this many
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60))
+    IDEMPOTENCY_MAX_KEYS = int(os.environ.get('IDEMPOTENCY_MAX_KEYS', 10000))
+    # A key still running after this many seconds was abandoned (the worker timed out)
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 30))
+    # UPI settlement reconciliation: how long after an order its credit may appear,
+    # the statement's offset from UTC (IST by default) and orders marked paid per commit
+    RECONCILE_WINDOW_MINUTES = int(os.environ.get('RECONCILE_WINDOW_MINUTES', 30))
+    STATEMENT_UTC_OFFSET_MINUTES = int(os.environ.get('STATEMENT_UTC_OFFSET_MINUTES', 330))
+    RECONCILE_BATCH_SIZE = 500
     # CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:5173').split(',')
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:5174').split(',')
-
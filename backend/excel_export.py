@@ -0,0 +1,30 @@
+"""
+Excel export of the database through SQLAlchemy.
+
+Rows are streamed in chunks (server-side cursors on PostgreSQL) and appended
+to a write-only workbook, which spools each sheet to a temporary file, so
+large order tables are never held in memory at once.
+"""
+from openpyxl import Workbook
+from sqlalchemy import inspect, select
+
+from models import db
+
+
+def export_to_excel(output, engine_for_table, chunk_size):
+    """Write every table to `output` (path or file object), one sheet per table"""
+    workbook = Workbook(write_only=True)
+    for table in db.metadata.sorted_tables:
+        engine = engine_for_table(table)
+        if not inspect(engine).has_table(table.name):
+            continue
+
+        sheet = workbook.create_sheet(table.name)
+        sheet.append([column.name for column in table.columns])
+        with engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+            result = conn.execute(select(table))
+            for chunk in result.partitions(chunk_size):
+                for row in chunk:
+                    sheet.append(list(row))
+    workbook.save(output)
@@ -1,21 +1,30 @@
-import sqlite3
-import pandas as pd
+"""
+Export the database to database_export.xlsx, and each outlet that has its
+own database (OUTLET_DATABASES) to database_export_<slug>.xlsx.
+Works with whatever DATABASE_URL points at (SQLite or PostgreSQL).
+"""
+import os
+import sys
 
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
 
-db_path = f"D:/NOMO/backend/instance/momo_orders.db"   # path to .db file
-conn = sqlite3.connect(db_path)
+from app import create_app
+from models import db
+from outlets import outlet_bind_key
+from excel_export import export_to_excel
 
-# Get all table names
-tables = pd.read_sql(
-    "SELECT name FROM sqlite_master WHERE type='table';",
-    conn
-)
+app = create_app()
+with app.app_context():
+    exports = {"database_export.xlsx": db.engine}
+    for slug in app.config['OUTLET_DATABASES']:
+        exports[f"database_export_{slug}.xlsx"] = db.engines[outlet_bind_key(slug)]
 
-with pd.ExcelWriter("database_export.xlsx", engine="openpyxl") as writer:
-    for table in tables["name"]:
-        df = pd.read_sql(f"SELECT * FROM {table}", conn)
-        df.to_excel(writer, sheet_name=table, index=False)
+    for filename, engine in exports.items():
+        # Tables missing from an outlet database (shared tables) are skipped
+        export_to_excel(filename, lambda table: engine, app.config['EXPORT_CHUNK_SIZE'])
+        print(f"Created {filename}")
 
-conn.close()
-
-print("Done! Excel file created.")
+print("Done! Excel files created.")
@@ -0,0 +1,134 @@
+"""
+Idempotency keys for customer POST endpoints.
+
+A client that retries with the same Idempotency-Key header gets the original
+response back without the request being validated or written again. Keys are
+claimed with a unique constraint in the database, so this holds across worker
+processes. Stored keys expire after IDEMPOTENCY_TTL and at most
+IDEMPOTENCY_MAX_KEYS are kept. A key whose request has been running for longer
+than IDEMPOTENCY_LOCK_TIMEOUT is taken to be abandoned (its worker was killed)
+and the next retry runs the request again.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+from outlets import current_outlet_id
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 100
+
+
+def _find(endpoint, key):
+    return IdempotencyKey.query.filter_by(
+        outlet_id=current_outlet_id(), endpoint=endpoint, key=key
+    ).first()
+
+
+def _prune(now):
+    """Drop expired keys and the oldest ones beyond the size cap"""
+    cutoff = now - timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+    IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+
+    max_id = db.session.query(func.max(IdempotencyKey.id)).scalar()
+    if max_id:
+        keep = current_app.config['IDEMPOTENCY_MAX_KEYS']
+        IdempotencyKey.query.filter(IdempotencyKey.id <= max_id - keep).delete(synchronize_session=False)
+
+
+def _in_progress():
+    return jsonify({'error': f'A request with this {HEADER} is still being processed'}), 409
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return jsonify({'error': f'{HEADER} was already used with a different request'}), 422
+    if record.status_code is None:
+        return _in_progress()
+
+    response = current_app.response_class(
+        record.response_body, status=record.status_code, mimetype='application/json'
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _abandoned(record, request_hash, now):
+    """Whether a key's first request stopped without storing a response"""
+    timeout = timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_TIMEOUT'])
+    return (
+        record.status_code is None
+        and record.request_hash == request_hash
+        and record.created_at < now - timeout
+    )
+
+
+def _reclaim(record, now):
+    """Claim an abandoned key again; only one retry can win"""
+    claimed = IdempotencyKey.query.filter_by(
+        id=record.id, status_code=None, created_at=record.created_at
+    ).update({'created_at': now}, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+
+def idempotent(view):
+    """Replay the stored response when a request repeats an Idempotency-Key"""
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        endpoint = request.endpoint
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        now = datetime.utcnow()
+
+        record = _find(endpoint, key)
+        if record and record.created_at >= now - timedelta(seconds=current_app.config['IDEMPOTENCY_TTL']):
+            if not _abandoned(record, request_hash, now):
+                return _replay(record, request_hash)
+            if not _reclaim(record, now):
+                return _in_progress()
+        else:
+            # Claim the key; the unique constraint lets only one request win
+            try:
+                _prune(now)
+                record = IdempotencyKey(
+                    outlet_id=current_outlet_id(), endpoint=endpoint, key=key,
+                    request_hash=request_hash, created_at=now
+                )
+                db.session.add(record)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                record = _find(endpoint, key)
+                if record:
+                    return _replay(record, request_hash)
+                raise
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(id=record.id).delete()
+            db.session.commit()
+            raise
+
+        if 200 <= response.status_code < 300:
+            # Only successful responses are replayed; failures can be retried
+            record.status_code = response.status_code
+            record.response_body = response.get_data(as_text=True)
+        else:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(id=record.id).delete()
+        db.session.commit()
+        return response
+    return decorated_function
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+"""
+Migration script to index orders by outlet, customer phone and time
+for repeat-customer lookups.
+Run this once to update existing database schema.
+"""
+from migrations import run_migration, create_missing_indexes
+from models import Order
+
+run_migration(lambda engine: create_missing_indexes(engine, Order.__table__))
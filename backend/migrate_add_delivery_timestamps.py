@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+"""
+Migration script to add the delivered_at column to order_items table.
+Run this once to update existing database schema.
+"""
+from migrations import run_migration, add_missing_columns
+from models import OrderItem
+
+run_migration(lambda engine: add_missing_columns(
+    engine, OrderItem.__table__, ['delivered_at']
+))
@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+"""
+Migration script to add the version column used for optimistic locking
+to orders table.
+Run this once to update existing database schema.
+"""
+from migrations import run_migration, add_missing_columns
+from models import Order
+
+run_migration(lambda engine: add_missing_columns(
+    engine, Order.__table__, ['version']
+))
@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+"""
+Migration script to add outlet_id columns for multi-outlet support.
+Existing rows are assigned to the default outlet (id 1).
+Run this once to update existing database schema.
+"""
+from migrations import run_migration, add_missing_columns
+from models import MenuItem, Order, RestaurantStatus, MerchantAccount
+
+
+def upgrade(engine):
+    for model in (MenuItem, Order, RestaurantStatus, MerchantAccount):
+        add_missing_columns(engine, model.__table__, ['outlet_id'])
+
+
+run_migration(upgrade)
@@ -0,0 +1,93 @@
+"""
+Helpers for the migrate_*.py scripts.
+
+Migrations go through SQLAlchemy so they run the same way on SQLite and
+PostgreSQL, against the main database and every outlet database.
+"""
+import os
+
+from sqlalchemy import create_engine, inspect, literal
+from sqlalchemy.engine import make_url
+
+from config import Config, engine_options
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _resolve_url(url):
+    # Flask-SQLAlchemy places relative SQLite paths in the instance folder
+    url = make_url(url)
+    if url.drivername.startswith('sqlite') and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(backend_dir, 'instance', url.database))
+    return url
+
+
+def database_engines():
+    """Engines for the main database and every outlet database, by label"""
+    urls = {'main': Config.SQLALCHEMY_DATABASE_URI}
+    urls.update(Config.OUTLET_DATABASES)
+    return {
+        label: create_engine(_resolve_url(url), **engine_options(url))
+        for label, url in urls.items()
+    }
+
+
+def add_missing_columns(engine, table, column_names):
+    """Add model columns missing from an existing table, with their indexes"""
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        print(f"✓ {table.name} table does not exist yet; it will be created on next app start")
+        return
+
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    added = []
+    with engine.begin() as conn:
+        for name in column_names:
+            if name in existing:
+                print(f"✓ {table.name}.{name} column already exists")
+                continue
+
+            column = table.c[name]
+            print(f"Adding {table.name}.{name} column...")
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(engine.dialect)}"
+            if column.default is not None and column.default.is_scalar:
+                value = literal(column.default.arg).compile(
+                    dialect=engine.dialect, compile_kwargs={'literal_binds': True}
+                )
+                ddl += f" DEFAULT {value}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            conn.exec_driver_sql(ddl)
+            added.append(name)
+            print(f"✓ Added {table.name}.{name} column")
+
+        for index in table.indexes:
+            if any(column.name in added for column in index.columns):
+                index.create(conn, checkfirst=True)
+
+
+def create_missing_indexes(engine, table):
+    """Create model indexes missing from an existing table"""
+    if not inspect(engine).has_table(table.name):
+        print(f"✓ {table.name} table does not exist yet; it will be created on next app start")
+        return
+
+    existing = {index['name'] for index in inspect(engine).get_indexes(table.name)}
+    with engine.begin() as conn:
+        for index in table.indexes:
+            if index.name in existing:
+                print(f"✓ {index.name} index already exists")
+                continue
+            print(f"Creating {index.name} index...")
+            index.create(conn)
+            print(f"✓ Created {index.name} index")
+
+
+def run_migration(upgrade):
+    """Run upgrade(engine) against every configured database"""
+    for label, engine in database_engines().items():
+        print(f"Migrating {label} database: {engine.url.render_as_string(hide_password=True)}")
+        upgrade(engine)
+        engine.dispose()
+    print("\nMigration completed successfully!")
@@ -1,8 +1,53 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+# Outlet that owns rows created before multi-outlet support
+DEFAULT_OUTLET_ID = 1
+
+# Tables holding per-outlet data. When an outlet has its own database these
+# are read and written there; everything else stays in the main database.
+OUTLET_TABLES = {
+    'menu_items', 'orders', 'order_items', 'restaurant_status',
+    'merchant_accounts', 'change_counters', 'idempotency_keys'
+}
+
+
+class OutletSession(Session):
+    """Session that routes outlet tables to the current outlet's own engine"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and mapper is not None and has_app_context():
+            bind_key = g.get('outlet_bind')
+            if bind_key and inspect(mapper).local_table.name in OUTLET_TABLES:
+                return self._db.engines[bind_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': OutletSession})
+
+
+class Outlet(db.Model):
+    """A stall; menus, status, merchants and orders are scoped to one outlet"""
+    __tablename__ = 'outlets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(50), unique=True, index=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    host = db.Column(db.String(255), unique=True, index=True, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'slug': self.slug,
+            'name': self.name,
+            'host': self.host
+        }
 
 
 class MenuItem(db.Model):
@@ -10,6 +55,7 @@ class MenuItem(db.Model):
     __tablename__ = 'menu_items'
     
     id = db.Column(db.Integer, primary_key=True)
+    outlet_id = db.Column(db.Integer, default=DEFAULT_OUTLET_ID, index=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(50), nullable=False)  # Normal Momos, Healthy Momos, Dim Sums
     price_full = db.Column(db.Float, nullable=False)
@@ -20,8 +66,8 @@ class MenuItem(db.Model):
     # Relationship
     order_items = db.relationship('OrderItem', backref='menu_item', lazy=True)
     
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None):
+        data = {
             'id': self.id,
             'name': self.name,
             'category': self.category,
@@ -29,13 +75,85 @@ class MenuItem(db.Model):
             'price_half': self.price_half,
             'is_available': self.is_available
         }
+        if fields:
+            data = {key: value for key, value in data.items() if key in fields}
+        return data
+
+
+class CatalogItem(db.Model):
+    """Universal catalog of items that can be added to the menu"""
+    __tablename__ = 'catalog_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, index=True, nullable=False)
+    category = db.Column(db.String(50), index=True, nullable=False)
+    price_full = db.Column(db.Float, nullable=False)
+    price_half = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'category': self.category,
+            'price_full': self.price_full,
+            'price_half': self.price_half
+        }
+
+
+class ChangeCounter(db.Model):
+    """Named counters bumped on writes so caches can detect changes cheaply"""
+    __tablename__ = 'change_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+    
+    @classmethod
+    def bump(cls, name):
+        """Increment a counter within the current transaction and return its new value"""
+        updated = cls.query.filter_by(name=name).update({cls.value: cls.value + 1})
+        if not updated:
+            db.session.add(cls(name=name, value=1))
+            db.session.flush()
+        return cls.current(name)
+    
+    @classmethod
+    def signal(cls, name):
+        """Increment a counter in its own short transaction and return its new value.
+        
+        Call after committing a write: the counter row is locked only for this
+        statement, not for the whole write, so writers are not serialized on it.
+        """
+        table = cls.__table__
+        engine = db.session.get_bind(mapper=cls.__mapper__)
+        for attempt in range(2):
+            try:
+                with engine.begin() as conn:
+                    updated = conn.execute(
+                        table.update().where(table.c.name == name).values(value=table.c.value + 1)
+                    ).rowcount
+                    if not updated:
+                        conn.execute(table.insert().values(name=name, value=1))
+                    return conn.execute(select(table.c.value).where(table.c.name == name)).scalar()
+            except IntegrityError:
+                # Another worker created the counter first; bump theirs
+                if attempt:
+                    raise
+    
+    @classmethod
+    def current(cls, name):
+        """Current value of a counter (0 if never bumped)"""
+        return db.session.query(cls.value).filter_by(name=name).scalar() or 0
 
 
 class Order(db.Model):
     """Order with payment and status tracking"""
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Repeat-customer lookups: a customer's recent orders at one outlet
+        db.Index('ix_orders_outlet_phone_timestamp', 'outlet_id', 'customer_phone', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    outlet_id = db.Column(db.Integer, default=DEFAULT_OUTLET_ID, index=True, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     payment_method = db.Column(db.String(20), nullable=False)  # cash or upi
     payment_status = db.Column(db.String(20), default='pending', nullable=False)  # pending or paid
@@ -44,27 +162,41 @@ class Order(db.Model):
     merchant_upi_id = db.Column(db.Integer, db.ForeignKey('merchant_accounts.id'), nullable=True)
     customer_name = db.Column(db.String(100), nullable=True)
     customer_phone = db.Column(db.String(20), nullable=True)
+    # Optimistic concurrency: every UPDATE checks and increments this
+    version = db.Column(db.Integer, default=1, nullable=False)
     
     # Relationships
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     merchant_account = db.relationship('MerchantAccount', backref='orders', lazy=True)
     
-    def to_dict(self, include_items=True):
+    __mapper_args__ = {'version_id_col': version}
+    
+    def to_dict(self, include_items=True, fields=None, item_names=True):
+        """Serialize the order; `fields` limits the top-level keys returned.
+        
+        Values are computed only for requested fields, so leaving out
+        merchant_upi also skips loading the merchant account.
+        """
+        getters = {
+            'id': lambda: self.id,
+            'timestamp': lambda: self.timestamp.isoformat(),
+            'payment_method': lambda: self.payment_method,
+            'payment_status': lambda: self.payment_status,
+            'order_status': lambda: self.order_status,
+            'total_amount': lambda: self.total_amount,
+            'merchant_upi_id': lambda: self.merchant_upi_id,
+            'merchant_upi': lambda: self.merchant_account.upi_id if self.merchant_account else None,
+            'customer_name': lambda: self.customer_name,
+            'customer_phone': lambda: self.customer_phone,
+            'version': lambda: self.version
+        }
         data = {
-            'id': self.id,
-            'timestamp': self.timestamp.isoformat(),
-            'payment_method': self.payment_method,
-            'payment_status': self.payment_status,
-            'order_status': self.order_status,
-            'total_amount': self.total_amount,
-            'merchant_upi_id': self.merchant_upi_id,
-            'merchant_upi': self.merchant_account.upi_id if self.merchant_account else None,
-            'customer_name': self.customer_name,
-            'customer_phone': self.customer_phone
+            key: getter() for key, getter in getters.items()
+            if not fields or key in fields
         }
         
         if include_items:
-            data['items'] = [item.to_dict() for item in self.order_items]
+            data['items'] = [item.to_dict(include_name=item_names) for item in self.order_items]
         
         return data
     
@@ -89,18 +221,21 @@ class OrderItem(db.Model):
     half_qty = db.Column(db.Integer, default=0, nullable=False)
     delivered_full = db.Column(db.Integer, default=0, nullable=False)
     delivered_half = db.Column(db.Integer, default=0, nullable=False)
+    delivered_at = db.Column(db.DateTime, nullable=True, index=True)  # last delivery checkbox change
     
-    def to_dict(self):
-        menu_item = self.menu_item
-        return {
+    def to_dict(self, include_name=True):
+        data = {
             'id': self.id,
             'menu_item_id': self.menu_item_id,
-            'menu_item_name': menu_item.name if menu_item else None,
             'full_qty': self.full_qty,
             'half_qty': self.half_qty,
             'delivered_full': self.delivered_full,
             'delivered_half': self.delivered_half
         }
+        if include_name:
+            menu_item = self.menu_item
+            data['menu_item_name'] = menu_item.name if menu_item else None
+        return data
 
 
 class RestaurantStatus(db.Model):
@@ -108,6 +243,7 @@ class RestaurantStatus(db.Model):
     __tablename__ = 'restaurant_status'
     
     id = db.Column(db.Integer, primary_key=True)
+    outlet_id = db.Column(db.Integer, default=DEFAULT_OUTLET_ID, index=True, nullable=False)
     is_open = db.Column(db.Boolean, default=True, nullable=False)
     pause_message = db.Column(db.Text, default='We are having multiple orders. This may take time.', nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -120,10 +256,11 @@ class RestaurantStatus(db.Model):
 
 
 class MerchantAccount(db.Model):
-    """Merchant UPI accounts - only one active at a time"""
+    """Merchant UPI accounts - only one active per outlet at a time"""
     __tablename__ = 'merchant_accounts'
     
     id = db.Column(db.Integer, primary_key=True)
+    outlet_id = db.Column(db.Integer, default=DEFAULT_OUTLET_ID, index=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
     upi_id = db.Column(db.String(100), nullable=False)
     is_active = db.Column(db.Boolean, default=False, nullable=False)
@@ -138,6 +275,23 @@ class MerchantAccount(db.Model):
         }
 
 
+class IdempotencyKey(db.Model):
+    """Stored response for a client-supplied Idempotency-Key"""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('outlet_id', 'endpoint', 'key', name='uq_idempotency_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    outlet_id = db.Column(db.Integer, default=DEFAULT_OUTLET_ID, nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)  # None while the first request is running
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, nullable=False)
+
+
 class AdminUser(db.Model):
     """Admin user for dashboard access"""
     __tablename__ = 'admin_users'
@@ -0,0 +1,107 @@
+"""
+Customer order tracking.
+
+Customers get an unguessable tracking token when an order is created, so they
+can follow that order without being able to enumerate others. Tracking
+requests may long-poll: the request waits on an in-process event (no database
+connection held) until the order is written or the wait times out. Writes made
+by other worker processes show up in the outlet's orders change counter, which
+one read per process checks for every waiting request; the order itself is
+reloaded only when the counter moves.
+"""
+import hashlib
+import hmac
+import threading
+import time
+
+from flask import current_app
+
+from active_orders import orders_counter
+from models import ChangeCounter
+
+# Long-poll limits, in seconds
+MAX_WAIT = 30
+# Writes made by other worker processes never fire our events, so waiting
+# clients check the outlet's orders counter at least this often
+RECHECK_INTERVAL = 2
+
+
+def tracking_token(outlet_id, order_id):
+    """Signed token that grants read access to a single order"""
+    key = current_app.config['SECRET_KEY'].encode()
+    message = f'order:{outlet_id}:{order_id}'.encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def verify_tracking_token(outlet_id, order_id, token):
+    """Check a tracking token in constant time"""
+    if not token:
+        return False
+    return hmac.compare_digest(tracking_token(outlet_id, order_id), token)
+
+
+def order_version(order):
+    """Version customers compare to notice changes; every order write bumps it"""
+    return order.version
+
+
+class OrderEvents:
+    """Wakes tracking requests waiting on an order when it is written"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiting = {}  # (outlet_id, order_id) -> [event, number of waiters]
+
+    def wait(self, outlet_id, order_id, timeout):
+        """Block until the order is written or the timeout passes"""
+        key = (outlet_id, order_id)
+        with self._lock:
+            entry = self._waiting.setdefault(key, [threading.Event(), 0])
+            entry[1] += 1
+        try:
+            return entry[0].wait(timeout)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and self._waiting.get(key) is entry:
+                    del self._waiting[key]
+
+    def notify(self, outlet_id, order_id):
+        """Wake everyone waiting on an order"""
+        with self._lock:
+            entry = self._waiting.pop((outlet_id, order_id), None)
+        if entry:
+            entry[0].set()
+
+
+order_events = OrderEvents()
+
+
+class OrderCounters:
+    """Each outlet's orders change counter, read at most once per RECHECK_INTERVAL.
+
+    All tracking requests of a process share the cached value, so however many
+    customers are waiting, polling costs one small query per outlet per interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}  # outlet_id -> (counter value, monotonic time of the read)
+
+    def current(self, outlet_id):
+        with self._lock:
+            cached = self._values.get(outlet_id)
+            now = time.monotonic()
+            if cached and now - cached[1] < RECHECK_INTERVAL:
+                return cached[0]
+            # Stamped with the time before the read, so a cached value is never newer than it claims
+            value = ChangeCounter.current(orders_counter(outlet_id))
+            self._values[outlet_id] = (value, now)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+order_counters = OrderCounters()
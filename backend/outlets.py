@@ -0,0 +1,164 @@
+"""
+Outlet routing.
+
+Each request is resolved to one outlet, either from a `/o/<slug>` path prefix
+or from the request host, falling back to the default outlet. Outlets listed
+in OUTLET_DATABASES get their own database, so a busy stall's SQLite write
+lock never blocks another.
+"""
+import threading
+
+from flask import g, request
+
+from sqlalchemy import select, text
+
+from models import db, Outlet, RestaurantStatus, DEFAULT_OUTLET_ID, OUTLET_TABLES
+
+PATH_PREFIX = '/o/'
+ENVIRON_KEY = 'nomo.outlet'
+
+
+def outlet_bind_key(slug):
+    """SQLALCHEMY_BINDS key for an outlet with its own database"""
+    return f'outlet:{slug}'
+
+
+class OutletPathMiddleware:
+    """Strip a /o/<slug> prefix so the same routes serve every outlet"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(PATH_PREFIX):
+            slug, _, rest = path[len(PATH_PREFIX):].partition('/')
+            if slug:
+                environ[ENVIRON_KEY] = slug
+                environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + PATH_PREFIX + slug
+                environ['PATH_INFO'] = '/' + rest
+        return self.wsgi_app(environ, start_response)
+
+
+class OutletRegistry:
+    """In-process cache of outlets by slug and host; outlets rarely change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_slug = None
+        self._by_host = None
+
+    def _load(self):
+        outlets = [
+            (outlet.id, outlet.slug, outlet.host)
+            for outlet in Outlet.query.all()
+        ]
+        self._by_slug = {slug: (outlet_id, slug) for outlet_id, slug, _ in outlets}
+        self._by_host = {
+            host.lower(): (outlet_id, slug)
+            for outlet_id, slug, host in outlets if host
+        }
+
+    def invalidate(self):
+        with self._lock:
+            self._by_slug = None
+            self._by_host = None
+
+    def lookup(self, slug=None, host=None):
+        """Return (outlet_id, slug) or None"""
+        with self._lock:
+            for attempt in range(2):
+                if self._by_slug is None:
+                    self._load()
+                if slug:
+                    found = self._by_slug.get(slug)
+                else:
+                    found = self._by_host.get(host.lower()) if host else None
+                if found or attempt or not slug:
+                    return found
+                # Unknown slug: the outlet may have just been created elsewhere
+                self._by_slug = None
+
+
+outlet_registry = OutletRegistry()
+
+
+def resolve_outlet():
+    """before_request hook: pick the outlet for this request once"""
+    slug = request.environ.get(ENVIRON_KEY)
+    if slug:
+        found = outlet_registry.lookup(slug=slug)
+        if not found:
+            return {'error': f'Unknown outlet "{slug}"'}, 404
+    else:
+        found = outlet_registry.lookup(host=request.host.split(':')[0])
+
+    outlet_id, slug = found or (DEFAULT_OUTLET_ID, None)
+    g.outlet_id = outlet_id
+    bind_key = outlet_bind_key(slug) if slug else None
+    g.outlet_bind = bind_key if bind_key in db.engines else None
+
+
+def current_outlet_id():
+    """Outlet of the current request (the default outlet outside requests)"""
+    return g.get('outlet_id', DEFAULT_OUTLET_ID)
+
+
+def engine_for_table(table):
+    """Engine holding a table for the current request's outlet"""
+    bind_key = g.get('outlet_bind')
+    if bind_key and table.name in OUTLET_TABLES:
+        return db.engines[bind_key]
+    return db.engine
+
+
+def outlet_tables():
+    return [table for name, table in db.metadata.tables.items() if name in OUTLET_TABLES]
+
+
+def init_outlets(app):
+    """Create outlet rows and per-outlet databases; call inside app context"""
+    if not db.session.get(Outlet, DEFAULT_OUTLET_ID):
+        db.session.add(Outlet(id=DEFAULT_OUTLET_ID, slug='main', name='Main Outlet'))
+        db.session.flush()
+    _sync_id_sequence(Outlet.__table__)
+
+    existing = {slug for (slug,) in db.session.query(Outlet.slug)}
+    for slug in app.config['OUTLET_DATABASES']:
+        if slug not in existing:
+            db.session.add(Outlet(slug=slug, name=slug.replace('-', ' ').title()))
+    db.session.commit()
+
+    for slug in app.config['OUTLET_DATABASES']:
+        db.metadata.create_all(db.engines[outlet_bind_key(slug)], tables=outlet_tables())
+
+    for outlet in Outlet.query.all():
+        ensure_outlet_status(outlet)
+
+
+def _sync_id_sequence(table):
+    """Move a PostgreSQL id sequence past rows inserted with explicit ids"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    db.session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+        f"(SELECT MAX(id) FROM {table.name}))"
+    ))
+
+
+def ensure_outlet_status(outlet):
+    """Give an outlet its restaurant status row (open) if it has none yet.
+
+    Ordering treats a missing row as closed, so every outlet needs one from
+    the moment it exists. The row lives in the outlet's own database when it
+    has one, whichever outlet the current request belongs to.
+    """
+    bind_key = outlet_bind_key(outlet.slug)
+    engine = db.engines[bind_key] if bind_key in db.engines else db.engine
+    table = RestaurantStatus.__table__
+    with engine.begin() as conn:
+        found = conn.execute(
+            select(table.c.id).where(table.c.outlet_id == outlet.id).limit(1)
+        ).first()
+        if not found:
+            conn.execute(table.insert().values(outlet_id=outlet.id, is_open=True))
@@ -0,0 +1,204 @@
+"""
+UPI settlement statement reconciliation.
+
+A statement CSV is streamed line by line and each credit is matched to a
+pending UPI order of the same merchant with the same amount, placed within a
+time window before the credit. Pending orders are indexed by amount (with
+timestamps sorted for bisection), so each line costs a dictionary lookup and
+a binary search rather than a scan. Matches are marked paid in batches; a
+match whose order was settled concurrently is reported as unmatched.
+"""
+import bisect
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from models import db, Order, ChangeCounter
+
+PENDING_STATUSES = ('pending', 'unpaid')
+
+# Accepted header names (lowercased) for each column we need
+AMOUNT_COLUMNS = ('amount', 'txn amount', 'transaction amount', 'credit', 'credit amount', 'amount (inr)')
+TIME_COLUMNS = ('timestamp', 'date', 'datetime', 'date & time', 'date time', 'txn date',
+                'transaction date', 'transaction time', 'time')
+REFERENCE_COLUMNS = ('utr', 'rrn', 'reference', 'reference no', 'upi ref no', 'txn id', 'transaction id')
+PAYEE_COLUMNS = ('upi id', 'payee vpa', 'vpa', 'merchant vpa')
+
+TIME_FORMATS = (
+    '%d-%m-%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%d-%m-%Y %H:%M', '%d/%m/%Y %H:%M',
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%d-%b-%Y %H:%M:%S', '%d %b %Y %H:%M:%S',
+)
+
+# A credit can be logged slightly before the order row due to clock skew
+CLOCK_SKEW = timedelta(minutes=2)
+
+
+def _pick_column(fieldnames, candidates):
+    lowered = {name.strip().lower(): name for name in fieldnames if name}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+def _parse_time(value):
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognised date/time "{value}"')
+
+
+def _to_paise(amount):
+    return round(float(str(amount).replace(',', '').replace('₹', '').strip()) * 100)
+
+
+class PendingOrderIndex:
+    """Pending UPI orders keyed by amount, each list sorted by timestamp"""
+
+    def __init__(self, rows):
+        by_amount = defaultdict(list)
+        for order_id, total_amount, timestamp in rows:
+            by_amount[_to_paise(total_amount)].append((timestamp, order_id))
+        self._times = {}
+        self._ids = {}
+        for amount, entries in by_amount.items():
+            entries.sort()
+            self._times[amount] = [timestamp for timestamp, _ in entries]
+            self._ids[amount] = [order_id for _, order_id in entries]
+        self._claimed = set()
+
+    def candidates(self, amount, credited_at, window):
+        """Unclaimed orders of this amount placed within `window` before the credit"""
+        times = self._times.get(amount)
+        if not times:
+            return []
+        start = bisect.bisect_left(times, credited_at - window)
+        end = bisect.bisect_right(times, credited_at + CLOCK_SKEW)
+        return [
+            order_id for order_id in self._ids[amount][start:end]
+            if order_id not in self._claimed
+        ]
+
+    def claim(self, order_id):
+        self._claimed.add(order_id)
+
+
+def _mark_paid(order_ids):
+    """Mark the still-pending orders among `order_ids` paid; returns the ids updated"""
+    # Bump versions and skip orders someone else already settled
+    still_pending = (Order.id.in_(order_ids), Order.payment_status.in_(PENDING_STATUSES))
+    values = {'payment_status': 'paid', 'version': Order.version + 1}
+    dialect = db.session.get_bind(mapper=Order.__mapper__).dialect
+    if dialect.update_returning:
+        result = db.session.execute(
+            update(Order).where(*still_pending).values(values).returning(Order.id),
+            execution_options={'synchronize_session': False}
+        )
+        return {order_id for (order_id,) in result}
+
+    updated = set()
+    for order_id in order_ids:
+        rowcount = Order.query.filter(Order.id == order_id, *still_pending[1:]).update(
+            values, synchronize_session=False
+        )
+        if rowcount:
+            updated.add(order_id)
+    return updated
+
+
+def reconcile_statement(stream, merchant, orders_query, window, utc_offset, batch_size, counter):
+    """Match a settlement CSV against pending UPI orders and mark matches paid.
+
+    `stream` is a binary file object, `orders_query` a query over the current
+    outlet's orders. Statement times are local; `utc_offset` converts them to
+    the UTC timestamps stored on orders. The `counter` change counter is bumped
+    after every batch that settled orders. Returns (report, matched order ids).
+    """
+    rows = (
+        orders_query
+        .filter(
+            Order.payment_method == 'upi',
+            Order.merchant_upi_id == merchant.id,
+            Order.payment_status.in_(PENDING_STATUSES)
+        )
+        .with_entities(Order.id, Order.total_amount, Order.timestamp)
+        .all()
+    )
+    index = PendingOrderIndex(rows)
+
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    fieldnames = reader.fieldnames or []
+    amount_column = _pick_column(fieldnames, AMOUNT_COLUMNS)
+    time_column = _pick_column(fieldnames, TIME_COLUMNS)
+    if not amount_column or not time_column:
+        raise ValueError('Statement must have amount and date/time columns')
+    reference_column = _pick_column(fieldnames, REFERENCE_COLUMNS)
+    payee_column = _pick_column(fieldnames, PAYEE_COLUMNS)
+
+    report = {'lines': 0, 'matched': [], 'ambiguous': [], 'unmatched': []}
+    matched_ids = []
+    batch = []  # matched report entries not yet written
+
+    def flush():
+        if not batch:
+            return
+        updated = _mark_paid([entry['order_id'] for entry in batch])
+        db.session.commit()
+        if updated:
+            ChangeCounter.signal(counter)
+        for entry in batch:
+            if entry['order_id'] in updated:
+                report['matched'].append(entry)
+                matched_ids.append(entry['order_id'])
+            else:
+                report['unmatched'].append({**entry, 'reason': 'Order is no longer pending'})
+        batch.clear()
+
+    for line_number, row in enumerate(reader, start=2):
+        report['lines'] += 1
+        entry = {'line': line_number}
+        if reference_column:
+            entry['reference'] = (row.get(reference_column) or '').strip()
+
+        try:
+            amount = _to_paise(row.get(amount_column) or '')
+            credited_at = _parse_time(row.get(time_column) or '') - utc_offset
+        except ValueError as e:
+            report['unmatched'].append({**entry, 'reason': str(e) or 'Invalid amount'})
+            continue
+        entry['amount'] = amount / 100
+
+        if payee_column and (row.get(payee_column) or '').strip().lower() not in ('', merchant.upi_id.lower()):
+            report['unmatched'].append({**entry, 'reason': 'Different merchant UPI ID'})
+            continue
+
+        candidates = index.candidates(amount, credited_at, window)
+        if not candidates:
+            report['unmatched'].append({**entry, 'reason': 'No pending order found'})
+        elif len(candidates) > 1:
+            report['ambiguous'].append({**entry, 'order_ids': candidates})
+        else:
+            order_id = candidates[0]
+            index.claim(order_id)
+            batch.append({**entry, 'order_id': order_id})
+            if len(batch) >= batch_size:
+                flush()
+
+    flush()
+    report['unmatched'].sort(key=lambda entry: entry['line'])
+    report['summary'] = {
+        'matched': len(report['matched']),
+        'ambiguous': len(report['ambiguous']),
+        'unmatched': len(report['unmatched'])
+    }
+    return report, matched_ids
@@ -0,0 +1,93 @@
+"""
+Response layer: fast JSON encoding, field selection and gzip.
+
+orjson is used for encoding when it is installed; otherwise Flask's default
+JSON provider is kept. API clients can trim payloads with `?fields=`,
+`?include_items=0` and `?format=compact`, and large JSON responses are
+gzip-compressed for clients that accept it.
+"""
+import gzip
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+FALSE_VALUES = {'0', 'false', 'no'}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_responses(app):
+    """Install the fast JSON provider and response compression"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    app.after_request(compress_response)
+
+
+def requested_fields():
+    """Field names from ?fields=a,b,c, or None for all fields"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+def serialize_orders(orders):
+    """Serialize orders honouring ?fields=, ?include_items= and ?format=compact.
+    
+    The compact format sends each menu item name once in a `menu` map
+    instead of repeating it on every order item.
+    """
+    include_items = request.args.get('include_items', '1').lower() not in FALSE_VALUES
+    compact = request.args.get('format') == 'compact'
+    fields = requested_fields()
+
+    serialized = [
+        order.to_dict(include_items=include_items, fields=fields, item_names=not compact)
+        for order in orders
+    ]
+    if not compact:
+        return serialized
+
+    menu = {}
+    if include_items:
+        for order in orders:
+            for item in order.order_items:
+                if item.menu_item_id not in menu:
+                    menu[item.menu_item_id] = item.menu_item.name if item.menu_item else None
+    return {'menu': menu, 'orders': serialized}
+
+
+def compress_response(response):
+    """after_request hook: gzip JSON responses above GZIP_MIN_SIZE bytes"""
+    if (
+        response.direct_passthrough
+        or response.status_code < 200 or response.status_code >= 300
+        or response.mimetype != 'application/json'
+        or 'Content-Encoding' in response.headers
+        or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['GZIP_MIN_SIZE']:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=current_app.config['GZIP_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
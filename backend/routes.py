@@ -1,14 +1,31 @@
-from flask import Blueprint, request, jsonify, session, send_file
-import os
-import sqlite3
-import pandas as pd
+from flask import Blueprint, request, jsonify, session, send_file, current_app
+import math
+import re
+import tempfile
 from models import (
     db, MenuItem, Order, OrderItem, RestaurantStatus, 
-    MerchantAccount, AdminUser
+    MerchantAccount, AdminUser, ChangeCounter, Outlet
 )
 from auth import require_admin, login_admin
-from universal_items import get_universal_items, get_universal_item_by_name
-from datetime import datetime
+from idempotency import idempotent
+from universal_items import (
+    get_universal_items, get_universal_item_by_name, get_universal_items_by_name
+)
+from outlets import current_outlet_id, outlet_registry, engine_for_table, ensure_outlet_status
+from excel_export import export_to_excel
+from responses import requested_fields, serialize_orders
+from wait_time import wait_times, with_wait_estimate
+from active_orders import active_orders_view, orders_counter
+from order_tracking import (
+    tracking_token, verify_tracking_token, order_version, order_events, order_counters,
+    MAX_WAIT, RECHECK_INTERVAL
+)
+from reconciliation import reconcile_statement
+from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
+import time
 
 # Create blueprints
 public_bp = Blueprint('public', __name__)
@@ -16,25 +33,107 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 now_name = datetime.now()
 
+# Bumped on every menu write; clients and caches compare it to spot changes
+MENU_COUNTER = 'menu'
+# Largest id an INTEGER primary key can hold
+MAX_ID = 2 ** 31 - 1
+
+
+def _menu_counter():
+    return f'{MENU_COUNTER}:{current_outlet_id()}'
+
+
+def _outlet_query(model):
+    """Query a per-outlet model, filtered to the current request's outlet"""
+    return model.query.filter_by(outlet_id=current_outlet_id())
+
+
+def _orders_with_items():
+    """All of the outlet's orders with items, menu names and merchants preloaded"""
+    return (
+        _outlet_query(Order)
+        .options(
+            selectinload(Order.order_items).joinedload(OrderItem.menu_item),
+            joinedload(Order.merchant_account)
+        )
+        .all()
+    )
+
+
+def _get_order(order_id):
+    return _outlet_query(Order).filter_by(id=order_id).first()
+
+
+def _entry_id(entry):
+    """Integer `id` of a bulk request entry, or None if missing or malformed"""
+    if not isinstance(entry, dict):
+        return None
+    entry_id = entry.get('id')
+    if isinstance(entry_id, bool) or not isinstance(entry_id, int):
+        return None
+    return entry_id
+
+
+def _as_id(value):
+    """`value` (an int or a numeric string) as an integer id, or None if it is not one"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        return None
+    # Out-of-range ids would make PostgreSQL reject the whole query
+    return value if 0 < value <= MAX_ID else None
+
+
+def _version_error(data, order):
+    """'invalid' or 'conflict' if the update's `version` is malformed or stale, else None.
+    
+    Updates without a version are still accepted while dashboards built before
+    versioning are in use; concurrent edits to such orders are not detected.
+    """
+    if 'version' not in data:
+        return None
+    version = data['version']
+    if isinstance(version, bool) or not isinstance(version, int):
+        return 'invalid'
+    return 'conflict' if version != order.version else None
+
+
+def _order_conflict(order_id):
+    """409 response carrying the order's current state after a lost version race"""
+    db.session.rollback()
+    order = _get_order(order_id)
+    return jsonify({
+        'error': 'Order was changed by someone else. Review it and retry.',
+        'order': with_wait_estimate(order) if order else None
+    }), 409
+
+
+def _orders_written(written, now=None):
+    """Signal other workers, refresh in-process caches and wake trackers after an order commit.
+    
+    The change counter is bumped in its own short transaction, after the
+    write committed, so order writes never queue behind the counter's row lock.
+    """
+    version = ChangeCounter.signal(orders_counter(current_outlet_id()))
+    active_orders_view(current_outlet_id()).orders_written(written, version)
+    for order in written:
+        wait_times(order.outlet_id).order_written(order, now)
+        order_events.notify(order.outlet_id, order.id)
+
+
 # ==================== ADMIN EXPORT ROUTE ====================
 @admin_bp.route('/export-db', methods=['GET'])
 @require_admin
 def export_db():
-    """Export the SQLite DB as an Excel file and send as download"""
-    db_path = os.path.join(os.path.dirname(__file__), 'instance', f'momo_orders.db')
-    if not os.path.exists(db_path):
-        return jsonify({'error': 'Database file not found'}), 404
-
-    conn = sqlite3.connect(db_path)
-    tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", conn)
-    output_path = os.path.join(os.path.dirname(__file__), 'instance', 'database_export.xlsx')
-    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-        for table in tables["name"]:
-            df = pd.read_sql(f"SELECT * FROM {table}", conn)
-            df.to_excel(writer, sheet_name=table, index=False)
-    conn.close()
+    """Export the database as an Excel file and send as download"""
+    # A temporary file rather than memory; it is deleted once the download is sent
+    output = tempfile.TemporaryFile()
+    export_to_excel(output, engine_for_table, current_app.config['EXPORT_CHUNK_SIZE'])
+    output.seek(0)
 
-    return send_file(output_path, as_attachment=True, download_name="database_export.xlsx")
+    return send_file(output, as_attachment=True, download_name="database_export.xlsx")
 
 
 # ==================== PUBLIC ROUTES ====================
@@ -42,35 +141,104 @@ def export_db():
 @public_bp.route('/status', methods=['GET'])
 def get_status():
     """Get restaurant status"""
-    status = RestaurantStatus.query.first()
+    status = _outlet_query(RestaurantStatus).first()
     if not status:
         # Initialize if not exists
-        status = RestaurantStatus(is_open=True)
+        status = RestaurantStatus(outlet_id=current_outlet_id(), is_open=True)
         db.session.add(status)
         db.session.commit()
     
-    return jsonify(status.to_dict())
+    data = status.to_dict()
+    data.update(wait_times(current_outlet_id()).estimate_for_new_order())
+    data['menu_version'] = ChangeCounter.current(_menu_counter())
+    return jsonify(data)
 
 
 @public_bp.route('/menu', methods=['GET'])
 def get_menu():
     """Get all menu items"""
-    items = MenuItem.query.filter_by(is_available=True).all()
-    return jsonify([item.to_dict() for item in items])
+    fields = requested_fields()
+    etag = f'menu-{ChangeCounter.current(_menu_counter())}'
+    if fields:
+        etag += '-' + '.'.join(sorted(fields))
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+    
+    items = _outlet_query(MenuItem).filter_by(is_available=True).all()
+    response = jsonify([item.to_dict(fields) for item in items])
+    response.set_etag(etag)
+    return response
+
+
+def _ordering_paused():
+    """Error response if the outlet is not accepting orders, else None"""
+    status = _outlet_query(RestaurantStatus).first()
+    if not status or not status.is_open:
+        return jsonify({
+            'error': 'Restaurant is currently paused',
+            'message': status.pause_message if status else 'Restaurant is closed'
+        }), 400
+    return None
+
+
+def _place_order(payment_method, customer_name, customer_phone, order_items_data, total_amount):
+    """Create and commit an order; returns (order, error)"""
+    if payment_method not in ['cash', 'upi']:
+        return None, 'Invalid payment method. Must be cash or upi'
+    
+    # Get active merchant for UPI orders
+    merchant_id = None
+    if payment_method == 'upi':
+        active_merchant = _outlet_query(MerchantAccount).filter_by(is_active=True).first()
+        if not active_merchant:
+            return None, 'No active merchant UPI account found'
+        merchant_id = active_merchant.id
+    
+    if total_amount <= 0:
+        return None, 'Order total must be greater than 0'
+    
+    # Create order
+    order = Order(
+        outlet_id=current_outlet_id(),
+        payment_method=payment_method,
+        payment_status='pending',
+        order_status='new',
+        total_amount=total_amount,
+        merchant_upi_id=merchant_id,
+        customer_name=customer_name,
+        customer_phone=customer_phone
+    )
+    
+    db.session.add(order)
+    db.session.flush()  # Get order ID
+    
+    # Create order items
+    for item_data in order_items_data:
+        order_item = OrderItem(
+            order_id=order.id,
+            menu_item_id=item_data['menu_item_id'],
+            full_qty=item_data['full_qty'],
+            half_qty=item_data['half_qty'],
+            delivered_full=0,
+            delivered_half=0
+        )
+        db.session.add(order_item)
+    
+    db.session.commit()
+    _orders_written([order])
+    return order, None
 
 
 @public_bp.route('/order', methods=['POST'])
+@idempotent
 def create_order():
     """Create a new order"""
     data = request.get_json()
     
     # Check if restaurant is open
-    status = RestaurantStatus.query.first()
-    if not status or not status.is_open:
-        return jsonify({
-            'error': 'Restaurant is currently paused',
-            'message': status.pause_message if status else 'Restaurant is closed'
-        }), 400
+    paused = _ordering_paused()
+    if paused:
+        return paused
     
     # Validate required fields
     if not data or 'items' not in data or 'payment_method' not in data:
@@ -93,25 +261,29 @@ def create_order():
     if not items or not isinstance(items, list):
         return jsonify({'error': 'Items must be a non-empty list'}), 400
     
-    # Get active merchant for UPI orders
-    merchant_id = None
-    if payment_method == 'upi':
-        active_merchant = MerchantAccount.query.filter_by(is_active=True).first()
-        if not active_merchant:
-            return jsonify({'error': 'No active merchant UPI account found'}), 400
-        merchant_id = active_merchant.id
+    if not all(isinstance(item_data, dict) for item_data in items):
+        return jsonify({'error': 'Each item must be an object'}), 400
+    
+    # Load every referenced menu item in one query
+    menu_item_ids = {_as_id(item_data.get('menu_item_id')) for item_data in items} - {None}
+    menu_items = {
+        menu_item.id: menu_item for menu_item in
+        _outlet_query(MenuItem).filter(MenuItem.id.in_(menu_item_ids)).all()
+    }
     
     # Validate items and calculate total
     total_amount = 0.0
     order_items_data = []
     
     for item_data in items:
-        menu_item_id = item_data.get('menu_item_id')
         full_qty = item_data.get('full_qty', 0)
         half_qty = item_data.get('half_qty', 0)
         
-        if not menu_item_id:
+        if not item_data.get('menu_item_id'):
             return jsonify({'error': 'Missing menu_item_id in item'}), 400
+        menu_item_id = _as_id(item_data['menu_item_id'])
+        if menu_item_id is None:
+            return jsonify({'error': 'menu_item_id must be an integer'}), 400
         
         if full_qty < 0 or half_qty < 0:
             return jsonify({'error': 'Quantities cannot be negative'}), 400
@@ -120,7 +292,7 @@ def create_order():
             continue  # Skip items with zero quantity
         
         # Get menu item
-        menu_item = MenuItem.query.get(menu_item_id)
+        menu_item = menu_items.get(menu_item_id)
         if not menu_item:
             return jsonify({'error': f'Menu item {menu_item_id} not found'}), 400
         
@@ -137,45 +309,140 @@ def create_order():
             'half_qty': half_qty
         })
     
-    if total_amount <= 0:
-        return jsonify({'error': 'Order total must be greater than 0'}), 400
+    order, error = _place_order(payment_method, customer_name, customer_phone, order_items_data, total_amount)
+    if error:
+        return jsonify({'error': error}), 400
     
-    # Create order
-    order = Order(
-        payment_method=payment_method,
-        payment_status='pending',
-        order_status='new',
-        total_amount=total_amount,
-        merchant_upi_id=merchant_id,
-        customer_name=customer_name,
-        customer_phone=customer_phone
+    return jsonify({
+        'success': True,
+        'order': with_wait_estimate(order),
+        'tracking_token': tracking_token(order.outlet_id, order.id),
+        'message': 'Order created successfully'
+    }), 201
+
+
+def _is_same_customer(order, customer_name):
+    """Simple verification: the name must match the one on the customer's order"""
+    return (order.customer_name or '').strip().lower() == customer_name.strip().lower()
+
+
+@public_bp.route('/customer/orders', methods=['GET'])
+def get_customer_orders():
+    """Get a customer's recent orders by phone number, in summary form"""
+    customer_phone = request.args.get('phone', '').strip()
+    customer_name = request.args.get('name', '').strip()
+    if not customer_phone or not customer_name:
+        return jsonify({'error': 'phone and name are required'}), 400
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 5)), 1), 20)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    # Served by the (outlet_id, customer_phone, timestamp) index
+    orders = (
+        _outlet_query(Order)
+        .filter_by(customer_phone=customer_phone)
+        .order_by(Order.timestamp.desc())
+        .limit(limit)
+        .options(selectinload(Order.order_items).joinedload(OrderItem.menu_item))
+        .all()
     )
+    if not orders or not _is_same_customer(orders[0], customer_name):
+        return jsonify({'error': 'No orders found'}), 404
+    
+    summary_fields = {'id', 'timestamp', 'total_amount', 'order_status', 'payment_status'}
+    return jsonify([
+        {
+            **order.to_dict(include_items=False, fields=summary_fields),
+            'tracking_token': tracking_token(order.outlet_id, order.id),
+            'items': [
+                {
+                    'menu_item_id': item.menu_item_id,
+                    'menu_item_name': item.menu_item.name if item.menu_item else None,
+                    'full_qty': item.full_qty,
+                    'half_qty': item.half_qty
+                }
+                for item in order.order_items
+            ]
+        }
+        for order in orders
+    ])
+
+
+@public_bp.route('/order/reorder', methods=['POST'])
+@idempotent
+def reorder():
+    """Place a past order again at current menu prices"""
+    data = request.get_json()
     
-    db.session.add(order)
-    db.session.flush()  # Get order ID
+    paused = _ordering_paused()
+    if paused:
+        return paused
     
-    # Create order items
-    for item_data in order_items_data:
-        order_item = OrderItem(
-            order_id=order.id,
-            menu_item_id=item_data['menu_item_id'],
-            full_qty=item_data['full_qty'],
-            half_qty=item_data['half_qty'],
-            delivered_full=0,
-            delivered_half=0
-        )
-        db.session.add(order_item)
+    if not data or 'order_id' not in data or 'payment_method' not in data:
+        return jsonify({'error': 'Missing required fields: order_id, payment_method'}), 400
     
-    db.session.commit()
+    customer_name = str(data.get('customer_name', '')).strip()
+    customer_phone = str(data.get('customer_phone', '')).strip()
+    if not customer_name or not customer_phone:
+        return jsonify({'error': 'Customer name and phone number are required'}), 400
+    
+    past_order_id = _as_id(data['order_id'])
+    if past_order_id is None:
+        return jsonify({'error': 'order_id must be an integer'}), 400
+    
+    # The past order, its items and their current menu rows in one query
+    past_order = (
+        _outlet_query(Order)
+        .filter_by(id=past_order_id, customer_phone=customer_phone)
+        .options(joinedload(Order.order_items).joinedload(OrderItem.menu_item))
+        .first()
+    )
+    if not past_order or not _is_same_customer(past_order, customer_name):
+        return jsonify({'error': 'Order not found'}), 404
+    
+    total_amount = 0.0
+    order_items_data = []
+    skipped = []
+    for item in past_order.order_items:
+        menu_item = item.menu_item
+        if not menu_item or not menu_item.is_available:
+            skipped.append({
+                'menu_item_id': item.menu_item_id,
+                'menu_item_name': menu_item.name if menu_item else None,
+                'reason': 'Currently unavailable'
+            })
+            continue
+        
+        total_amount += (menu_item.price_full * item.full_qty) + (menu_item.price_half * item.half_qty)
+        order_items_data.append({
+            'menu_item_id': item.menu_item_id,
+            'full_qty': item.full_qty,
+            'half_qty': item.half_qty
+        })
+    
+    if not order_items_data:
+        return jsonify({'error': 'None of the items in this order are available', 'skipped': skipped}), 400
+    
+    order, error = _place_order(
+        str(data['payment_method']).lower(),
+        past_order.customer_name, customer_phone, order_items_data, total_amount
+    )
+    if error:
+        return jsonify({'error': error}), 400
     
     return jsonify({
         'success': True,
-        'order': order.to_dict(),
+        'order': with_wait_estimate(order),
+        'tracking_token': tracking_token(order.outlet_id, order.id),
+        'skipped': skipped,
         'message': 'Order created successfully'
     }), 201
 
 
 @public_bp.route('/payment/confirm', methods=['POST'])
+@idempotent
 def confirm_payment():
     """Confirm UPI payment manually"""
     data = request.get_json()
@@ -184,7 +451,7 @@ def confirm_payment():
         return jsonify({'error': 'Missing order_id'}), 400
     
     order_id = data['order_id']
-    order = Order.query.get(order_id)
+    order = _get_order(order_id)
     
     if not order:
         return jsonify({'error': 'Order not found'}), 404
@@ -196,12 +463,63 @@ def confirm_payment():
         return jsonify({'error': 'Payment already confirmed'}), 400
     
     order.payment_status = 'unpaid'
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        return _order_conflict(order_id)
+    _orders_written([order])
     
     return jsonify({
         'success': True,
         'message': 'Payment confirmed',
-        'order': order.to_dict()
+        'order': with_wait_estimate(order)
+    })
+
+
+@public_bp.route('/order/<int:order_id>/track', methods=['GET'])
+def track_order(order_id):
+    """Track order progress, optionally long-polling until it changes"""
+    if not verify_tracking_token(current_outlet_id(), order_id, request.args.get('token')):
+        return jsonify({'error': 'Order not found'}), 404
+    
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    if not math.isfinite(wait):
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    wait = min(max(wait, 0), MAX_WAIT)
+    known_version = request.args.get('version', type=int)
+    
+    # Read before the order: any later write moves the counter past this value
+    counter = order_counters.current(current_outlet_id()) if wait else None
+    order = _get_order(order_id)
+    if not order:
+        return jsonify({'error': 'Order not found'}), 404
+    version = order_version(order)
+    
+    deadline = time.monotonic() + wait
+    while version == known_version:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Give the connection back to the pool while waiting
+        db.session.remove()
+        if not order_events.wait(current_outlet_id(), order_id, min(remaining, RECHECK_INTERVAL)):
+            # Not written by this process; reload only if another worker wrote
+            latest = order_counters.current(current_outlet_id())
+            if latest == counter:
+                continue
+            counter = latest
+        order = _get_order(order_id)
+        if not order:
+            return jsonify({'error': 'Order not found'}), 404
+        version = order_version(order)
+    
+    return jsonify({
+        'version': version,
+        'changed': version != known_version,
+        'order': with_wait_estimate(order)
     })
 
 
@@ -236,85 +554,218 @@ def admin_login():
 @require_admin
 def get_orders():
     """Get active orders (not fully delivered)"""
-    orders = Order.query.all()
+    if not request.args:
+        # Served from the in-memory view, already serialized
+        return current_app.response_class(
+            active_orders_view(current_outlet_id()).read_json(), mimetype='application/json'
+        )
+    
+    orders = _orders_with_items()
     active_orders = [order for order in orders if not order.is_fully_delivered()]
     
     # Sort by timestamp (newest first)
     active_orders.sort(key=lambda x: x.timestamp, reverse=True)
     
-    return jsonify([order.to_dict() for order in active_orders])
+    return jsonify(serialize_orders(active_orders))
 
 
 @admin_bp.route('/orders/delivered', methods=['GET'])
 @require_admin
 def get_delivered_orders():
     """Get delivered orders"""
-    orders = Order.query.all()
+    orders = _orders_with_items()
     delivered_orders = [order for order in orders if order.is_fully_delivered()]
     
     # Sort by timestamp (newest first)
     delivered_orders.sort(key=lambda x: x.timestamp, reverse=True)
     
-    return jsonify([order.to_dict() for order in delivered_orders])
+    return jsonify(serialize_orders(delivered_orders))
 
 
-@admin_bp.route('/order/<int:order_id>', methods=['PATCH'])
-@require_admin
-def update_order(order_id):
-    """Update order (payment status, order status, delivery checkboxes)"""
-    order = Order.query.get(order_id)
-    if not order:
-        return jsonify({'error': 'Order not found'}), 404
+def _apply_order_update(order, data, now):
+    """Validate and apply one order's payment/status/delivery changes.
     
-    data = request.get_json()
+    Returns (changes, error). Nothing is modified when an
+    error is returned. `changes` lists only fields whose value changed.
+    """
+    if 'payment_status' in data and data['payment_status'] not in ['pending', 'paid']:
+        return None, 'Invalid payment_status'
     
-    # Update payment status
-    if 'payment_status' in data:
-        if data['payment_status'] in ['pending', 'paid']:
-            order.payment_status = data['payment_status']
-        else:
-            return jsonify({'error': 'Invalid payment_status'}), 400
-    
-    # Update order status
-    if 'order_status' in data:
-        if data['order_status'] in ['new', 'preparing', 'served']:
-            order.order_status = data['order_status']
-        else:
-            return jsonify({'error': 'Invalid order_status'}), 400
-    
-    # Update delivery checkboxes for order items
+    if 'order_status' in data and data['order_status'] not in ['new', 'preparing', 'served']:
+        return None, 'Invalid order_status'
+    
+    # Validate delivery checkboxes against the order's own items
+    items_by_id = {item.id: item for item in order.order_items}
+    item_updates = []
     if 'items' in data and isinstance(data['items'], list):
         for item_update in data['items']:
-            item_id = item_update.get('id')
-            if not item_id:
+            order_item = items_by_id.get(_entry_id(item_update))
+            if not order_item:
                 continue
             
-            order_item = OrderItem.query.get(item_id)
-            if not order_item or order_item.order_id != order_id:
-                continue
+            try:
+                delivered_full = int(item_update.get('delivered_full', order_item.delivered_full))
+                delivered_half = int(item_update.get('delivered_half', order_item.delivered_half))
+            except (TypeError, ValueError):
+                return None, 'Delivered quantities must be integers'
             
-            if 'delivered_full' in item_update:
-                delivered_full = int(item_update['delivered_full'])
-                if delivered_full < 0 or delivered_full > order_item.full_qty:
-                    return jsonify({'error': 'Invalid delivered_full quantity'}), 400
-                order_item.delivered_full = delivered_full
+            if delivered_full < 0 or delivered_full > order_item.full_qty:
+                return None, 'Invalid delivered_full quantity'
+            if delivered_half < 0 or delivered_half > order_item.half_qty:
+                return None, 'Invalid delivered_half quantity'
             
-            if 'delivered_half' in item_update:
-                delivered_half = int(item_update['delivered_half'])
-                if delivered_half < 0 or delivered_half > order_item.half_qty:
-                    return jsonify({'error': 'Invalid delivered_half quantity'}), 400
-                order_item.delivered_half = delivered_half
+            item_updates.append((order_item, delivered_full, delivered_half))
+    
+    changes = {}
+    for field in ('payment_status', 'order_status'):
+        if field in data and getattr(order, field) != data[field]:
+            setattr(order, field, data[field])
+            changes[field] = data[field]
+    
+    item_changes = []
+    for order_item, delivered_full, delivered_half in item_updates:
+        item_change = {}
+        if delivered_full != order_item.delivered_full:
+            item_change['delivered_full'] = delivered_full
+        if delivered_half != order_item.delivered_half:
+            item_change['delivered_half'] = delivered_half
+        if not item_change:
+            continue
+        
+        # Delivery times feed the wait-time service rate
+        if delivered_full > order_item.delivered_full or delivered_half > order_item.delivered_half:
+            order_item.delivered_at = now
+        
+        order_item.delivered_full = delivered_full
+        order_item.delivered_half = delivered_half
+        item_changes.append({'id': order_item.id, **item_change})
+    
+    if item_changes:
+        changes['items'] = item_changes
+
+    # Item-only (or apparently no-op) writes must still check and bump the
+    # order's version; the order and its items may have been read at
+    # different points around a concurrent commit
+    flag_modified(order, 'order_status')
     
     # Auto-update order status to served if all items are delivered
-    if order.is_fully_delivered():
+    if order.is_fully_delivered() and order.order_status != 'served':
         order.order_status = 'served'
+        changes['order_status'] = 'served'
     
-    db.session.commit()
+    return changes, None
+
+
+@admin_bp.route('/order/<int:order_id>', methods=['PATCH'])
+@require_admin
+def update_order(order_id):
+    """Update order (payment status, order status, delivery checkboxes)"""
+    order = _get_order(order_id)
+    if not order:
+        return jsonify({'error': 'Order not found'}), 404
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No updates provided'}), 400
+    
+    # Clients send the version they last saw; a stale one means a concurrent edit
+    version_error = _version_error(data, order)
+    if version_error == 'invalid':
+        return jsonify({'error': 'version must be an integer'}), 400
+    if version_error == 'conflict':
+        return _order_conflict(order_id)
+    
+    now = datetime.utcnow()
+    changes, error = _apply_order_update(order, data, now)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # The UPDATE is conditional on the version loaded above
+    try:
+        db.session.commit()
+    except StaleDataError:
+        return _order_conflict(order_id)
+    _orders_written([order], now)
     
     return jsonify({
         'success': True,
         'message': 'Order updated successfully',
-        'order': order.to_dict()
+        'order': with_wait_estimate(order)
+    })
+
+
+@admin_bp.route('/orders/bulk', methods=['PATCH'])
+@require_admin
+def bulk_update_orders():
+    """Apply payment/status/delivery changes to many orders in one commit"""
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('orders'), list):
+        return jsonify({'error': 'Missing required field: orders'}), 400
+    
+    entries = data['orders']
+    order_ids = {_entry_id(entry) for entry in entries} - {None}
+    orders = (
+        _outlet_query(Order)
+        .options(joinedload(Order.order_items))
+        .filter(Order.id.in_(order_ids))
+        .all()
+    ) if order_ids else []
+    orders_by_id = {order.id: order for order in orders}
+    
+    now = datetime.utcnow()
+    updated = []
+    errors = []
+    written = []
+    for index, entry in enumerate(entries):
+        order_id = _entry_id(entry)
+        if order_id is None:
+            errors.append({'index': index, 'error': 'Missing or invalid order id'})
+            continue
+        
+        order = orders_by_id.get(order_id)
+        if not order:
+            errors.append({'index': index, 'id': order_id, 'error': 'Order not found'})
+            continue
+        
+        version_error = _version_error(entry, order)
+        if version_error == 'invalid':
+            errors.append({'index': index, 'id': order.id, 'error': 'version must be an integer'})
+            continue
+        if version_error == 'conflict':
+            errors.append({
+                'index': index, 'id': order.id, 'error': 'Version conflict',
+                'order': order.to_dict()
+            })
+            continue
+        
+        changes, error = _apply_order_update(order, entry, now)
+        if error:
+            errors.append({'index': index, 'id': order.id, 'error': error})
+            continue
+        
+        if changes:
+            updated.append({'id': order.id, 'changes': changes})
+        # Even no-op entries bump the order's version, so caches must see them
+        written.append(order)
+    
+    if written:
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # An order changed after it was loaded; nothing in the batch was applied
+            db.session.rollback()
+            current = _outlet_query(Order).filter(Order.id.in_(order_ids)).all()
+            return jsonify({
+                'error': 'Orders were changed by someone else. Review them and retry.',
+                'orders': [order.to_dict() for order in current]
+            }), 409
+        _orders_written(written, now)
+    
+    return jsonify({
+        'success': not errors,
+        'updated': updated,
+        'errors': errors
     })
 
 
@@ -322,9 +773,9 @@ def update_order(order_id):
 @require_admin
 def update_status():
     """Update restaurant status"""
-    status = RestaurantStatus.query.first()
+    status = _outlet_query(RestaurantStatus).first()
     if not status:
-        status = RestaurantStatus(is_open=True)
+        status = RestaurantStatus(outlet_id=current_outlet_id(), is_open=True)
         db.session.add(status)
     
     data = request.get_json()
@@ -348,20 +799,45 @@ def update_status():
 @require_admin
 def get_merchants():
     """Get all merchant accounts"""
-    merchants = MerchantAccount.query.all()
+    merchants = _outlet_query(MerchantAccount).all()
     return jsonify([merchant.to_dict() for merchant in merchants])
 
 
+@admin_bp.route('/merchants', methods=['POST'])
+@require_admin
+def add_merchant():
+    """Add a merchant UPI account to the current outlet"""
+    data = request.get_json()
+    
+    if not data or not data.get('name') or not data.get('upi_id'):
+        return jsonify({'error': 'Missing required fields: name, upi_id'}), 400
+    
+    merchant = MerchantAccount(
+        outlet_id=current_outlet_id(),
+        name=str(data['name']).strip(),
+        upi_id=str(data['upi_id']).strip(),
+        is_active=False
+    )
+    db.session.add(merchant)
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Merchant added successfully',
+        'merchant': merchant.to_dict()
+    }), 201
+
+
 @admin_bp.route('/merchant/<int:merchant_id>/activate', methods=['PATCH'])
 @require_admin
 def activate_merchant(merchant_id):
     """Activate a merchant account (deactivates others)"""
-    merchant = MerchantAccount.query.get(merchant_id)
+    merchant = _outlet_query(MerchantAccount).filter_by(id=merchant_id).first()
     if not merchant:
         return jsonify({'error': 'Merchant not found'}), 404
     
-    # Deactivate all merchants
-    MerchantAccount.query.update({'is_active': False})
+    # Deactivate all of this outlet's merchants
+    _outlet_query(MerchantAccount).update({'is_active': False})
     
     # Activate selected merchant
     merchant.is_active = True
@@ -374,19 +850,103 @@ def activate_merchant(merchant_id):
     })
 
 
+@admin_bp.route('/merchant/<int:merchant_id>/reconcile', methods=['POST'])
+@require_admin
+def reconcile_merchant_statement(merchant_id):
+    """Mark pending UPI orders paid from a settlement statement CSV"""
+    merchant = _outlet_query(MerchantAccount).filter_by(id=merchant_id).first()
+    if not merchant:
+        return jsonify({'error': 'Merchant not found'}), 404
+    
+    statement = request.files.get('file')
+    if not statement:
+        return jsonify({'error': 'Statement CSV file required (form field "file")'}), 400
+    
+    try:
+        window = timedelta(minutes=float(request.args.get(
+            'window', current_app.config['RECONCILE_WINDOW_MINUTES']
+        )))
+    except ValueError:
+        return jsonify({'error': 'window must be a number of minutes'}), 400
+    
+    try:
+        report, matched_ids = reconcile_statement(
+            statement.stream,
+            merchant,
+            _outlet_query(Order),
+            window,
+            timedelta(minutes=current_app.config['STATEMENT_UTC_OFFSET_MINUTES']),
+            current_app.config['RECONCILE_BATCH_SIZE'],
+            orders_counter(current_outlet_id())
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Could not read statement: {e}'}), 400
+    
+    for order_id in matched_ids:
+        order_events.notify(current_outlet_id(), order_id)
+    
+    return jsonify({
+        'success': True,
+        'merchant': merchant.to_dict(),
+        **report
+    })
+
+
+@admin_bp.route('/outlets', methods=['GET'])
+@require_admin
+def get_outlets():
+    """Get all outlets"""
+    outlets = Outlet.query.order_by(Outlet.id).all()
+    return jsonify([outlet.to_dict() for outlet in outlets])
+
+
+@admin_bp.route('/outlets', methods=['POST'])
+@require_admin
+def add_outlet():
+    """Add an outlet, reachable at /o/<slug> or on its own host"""
+    data = request.get_json()
+    
+    if not data or not data.get('slug') or not data.get('name'):
+        return jsonify({'error': 'Missing required fields: slug, name'}), 400
+    
+    slug = str(data['slug']).strip().lower()
+    if not re.fullmatch(r'[a-z0-9-]+', slug):
+        return jsonify({'error': 'Slug may only contain lowercase letters, digits and dashes'}), 400
+    host = str(data['host']).strip().lower() if data.get('host') else None
+    
+    if Outlet.query.filter_by(slug=slug).first():
+        return jsonify({'error': f'Outlet "{slug}" already exists'}), 400
+    if host and Outlet.query.filter_by(host=host).first():
+        return jsonify({'error': f'Host "{host}" is already used by another outlet'}), 400
+    
+    outlet = Outlet(slug=slug, name=str(data['name']).strip(), host=host)
+    db.session.add(outlet)
+    db.session.commit()
+    ensure_outlet_status(outlet)
+    outlet_registry.invalidate()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Outlet added successfully',
+        'outlet': outlet.to_dict()
+    }), 201
+
+
 @admin_bp.route('/menu', methods=['GET'])
 @require_admin
 def get_all_menu_items():
     """Get all menu items (including unavailable ones)"""
-    items = MenuItem.query.order_by(MenuItem.category, MenuItem.name).all()
-    return jsonify([item.to_dict() for item in items])
+    items = _outlet_query(MenuItem).order_by(MenuItem.category, MenuItem.name).all()
+    fields = requested_fields()
+    return jsonify([item.to_dict(fields) for item in items])
 
 
 @admin_bp.route('/menu/<int:item_id>', methods=['PATCH'])
 @require_admin
 def update_menu_item(item_id):
     """Update menu item (toggle availability, update prices)"""
-    item = MenuItem.query.get(item_id)
+    item = _outlet_query(MenuItem).filter_by(id=item_id).first()
     if not item:
         return jsonify({'error': 'Menu item not found'}), 404
     
@@ -407,6 +967,7 @@ def update_menu_item(item_id):
             return jsonify({'error': 'Price cannot be negative'}), 400
         item.price_half = price
     
+    ChangeCounter.bump(_menu_counter())
     db.session.commit()
     
     return jsonify({
@@ -428,7 +989,7 @@ def add_menu_item():
     item_name = data['name']
     
     # Check if item already exists in menu
-    existing = MenuItem.query.filter_by(name=item_name).first()
+    existing = _outlet_query(MenuItem).filter_by(name=item_name).first()
     if existing:
         return jsonify({'error': f'Item "{item_name}" already exists in menu'}), 400
     
@@ -443,6 +1004,7 @@ def add_menu_item():
     
     # Create new menu item
     menu_item = MenuItem(
+        outlet_id=current_outlet_id(),
         name=universal_item['name'],
         category=universal_item['category'],
         price_full=float(price_full),
@@ -451,6 +1013,7 @@ def add_menu_item():
     )
     
     db.session.add(menu_item)
+    ChangeCounter.bump(_menu_counter())
     db.session.commit()
     
     return jsonify({
@@ -460,23 +1023,153 @@ def add_menu_item():
     }), 201
 
 
+@admin_bp.route('/menu/bulk-add', methods=['POST'])
+@require_admin
+def bulk_add_menu_items():
+    """Add many items from the universal list to the menu in one transaction"""
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('items'), list):
+        return jsonify({'error': 'Missing required field: items'}), 400
+    
+    entries = [
+        entry if isinstance(entry, dict) else {'name': entry}
+        for entry in data['items']
+    ]
+    names = {entry.get('name') for entry in entries if isinstance(entry.get('name'), str)}
+    universal_items = get_universal_items_by_name(names)
+    existing = {
+        name for (name,) in
+        db.session.query(MenuItem.name)
+        .filter_by(outlet_id=current_outlet_id())
+        .filter(MenuItem.name.in_(names))
+    }
+    
+    added = []
+    errors = []
+    for index, entry in enumerate(entries):
+        item_name = entry.get('name')
+        if not isinstance(item_name, str):
+            errors.append({'index': index, 'error': 'Missing or invalid item name'})
+            continue
+        universal_item = universal_items.get(item_name)
+        if not universal_item:
+            errors.append({'index': index, 'name': item_name, 'error': 'Not found in universal list'})
+            continue
+        if item_name in existing:
+            errors.append({'index': index, 'name': item_name, 'error': 'Already exists in menu'})
+            continue
+        
+        try:
+            price_full = float(entry.get('price_full', universal_item['price_full']))
+            price_half = float(entry.get('price_half', universal_item['price_half']))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'name': item_name, 'error': 'Invalid price'})
+            continue
+        if price_full < 0 or price_half < 0:
+            errors.append({'index': index, 'name': item_name, 'error': 'Price cannot be negative'})
+            continue
+        
+        menu_item = MenuItem(
+            outlet_id=current_outlet_id(),
+            name=universal_item['name'],
+            category=universal_item['category'],
+            price_full=price_full,
+            price_half=price_half,
+            is_available=True
+        )
+        db.session.add(menu_item)
+        existing.add(item_name)
+        added.append(menu_item)
+    
+    if added:
+        ChangeCounter.bump(_menu_counter())
+    db.session.commit()
+    
+    return jsonify({
+        'success': not errors,
+        'items': [item.to_dict() for item in added],
+        'errors': errors,
+        'menu_version': ChangeCounter.current(_menu_counter())
+    }), 201 if added else 200
+
+
+@admin_bp.route('/menu/bulk', methods=['PATCH'])
+@require_admin
+def bulk_update_menu_items():
+    """Update prices and availability of many menu items in one transaction"""
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('items'), list):
+        return jsonify({'error': 'Missing required field: items'}), 400
+    
+    entries = data['items']
+    item_ids = {_entry_id(entry) for entry in entries} - {None}
+    items_by_id = {
+        item.id: item for item in
+        _outlet_query(MenuItem).filter(MenuItem.id.in_(item_ids)).all()
+    } if item_ids else {}
+    
+    updated = []
+    errors = []
+    for index, entry in enumerate(entries):
+        item_id = _entry_id(entry)
+        if item_id is None:
+            errors.append({'index': index, 'error': 'Missing or invalid menu item id'})
+            continue
+        
+        item = items_by_id.get(item_id)
+        if not item:
+            errors.append({'index': index, 'error': 'Menu item not found'})
+            continue
+        
+        try:
+            prices = {
+                field: float(entry[field])
+                for field in ('price_full', 'price_half') if field in entry
+            }
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'id': item.id, 'error': 'Invalid price'})
+            continue
+        if any(price < 0 for price in prices.values()):
+            errors.append({'index': index, 'id': item.id, 'error': 'Price cannot be negative'})
+            continue
+        
+        changes = {}
+        if 'is_available' in entry and item.is_available != bool(entry['is_available']):
+            changes['is_available'] = bool(entry['is_available'])
+        for field, price in prices.items():
+            if getattr(item, field) != price:
+                changes[field] = price
+        
+        for field, value in changes.items():
+            setattr(item, field, value)
+        if changes:
+            updated.append({'id': item.id, 'changes': changes})
+    
+    if updated:
+        ChangeCounter.bump(_menu_counter())
+    db.session.commit()
+    
+    return jsonify({
+        'success': not errors,
+        'updated': updated,
+        'errors': errors,
+        'menu_version': ChangeCounter.current(_menu_counter())
+    })
+
+
 @admin_bp.route('/universal-items', methods=['GET'])
 @require_admin
 def get_universal_items_list():
     """Get universal items list"""
-    universal_items = get_universal_items()
-    
-    # Get current menu items to show which are already added
-    current_menu_items = MenuItem.query.all()
-    current_names = {item.name for item in current_menu_items}
-    
-    # Mark which items are already in menu
-    items_with_status = []
-    for item in universal_items:
-        items_with_status.append({
-            **item,
-            'in_menu': item['name'] in current_names
-        })
-    
-    return jsonify(items_with_status)
-
+    # The menu may live in the outlet's own database, so only names are fetched
+    current_names = {
+        name for (name,) in
+        db.session.query(MenuItem.name).filter_by(outlet_id=current_outlet_id())
+    }
+    
+    return jsonify([
+        {**item, 'in_menu': item['name'] in current_names}
+        for item in get_universal_items()
+    ])
@@ -1,5 +1,5 @@
 from models import db, MenuItem, RestaurantStatus, MerchantAccount, AdminUser
-from universal_items import get_universal_items
+from universal_items import seed_catalog, get_universal_items_by_name
 
 def seed_database():
     """Initialize database with seed data"""
@@ -26,9 +26,10 @@ def seed_database():
         # 'Chicken Chilly Oil'
     ]
     
-    universal_items = get_universal_items()
+    seed_catalog()
+    universal_items = get_universal_items_by_name(initial_menu_items)
     for item_name in initial_menu_items:
-        universal_item = next((item for item in universal_items if item['name'] == item_name), None)
+        universal_item = universal_items.get(item_name)
         if universal_item:
             menu_item = MenuItem(
                 name=universal_item['name'],
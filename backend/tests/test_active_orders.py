@@ -0,0 +1,64 @@
+"""
+The in-memory active-orders view stays in step with the database.
+"""
+import io
+
+import active_orders
+from conftest import place_order
+from models import db, Order
+from test_reconciliation import _statement, _upi_orders
+
+
+def _assert_view_current(admin):
+    cached = admin.get('/admin/orders').get_json()
+    # Any query string bypasses the view and reads the database
+    fresh = admin.get('/admin/orders?fields=id,version').get_json()
+    assert [(o['id'], o['version']) for o in cached] == [(o['id'], o['version']) for o in fresh]
+
+    active_orders._views.clear()
+    assert admin.get('/admin/orders').get_json() == cached
+    return cached
+
+
+def test_view_matches_database_after_every_kind_of_write(app, admin):
+    menu = admin.get('/menu').get_json()
+    _assert_view_current(admin)
+
+    # Create
+    cash = place_order(admin, menu[0]['id'], full_qty=2)
+    upi = _upi_orders(admin, 2)
+    _assert_view_current(admin)
+
+    # Single update, including a delivery that takes the order out of the view
+    response = admin.patch(f"/admin/order/{cash['id']}", json={
+        'version': cash['version'], 'payment_status': 'paid'
+    })
+    assert response.status_code == 200, response.get_json()
+    _assert_view_current(admin)
+    response = admin.patch(f"/admin/order/{cash['id']}", json={
+        'version': cash['version'] + 1,
+        'items': [{'id': cash['items'][0]['id'], 'delivered_full': 2}]
+    })
+    assert response.status_code == 200, response.get_json()
+    assert cash['id'] not in [o['id'] for o in _assert_view_current(admin)]
+
+    # Bulk, with one real change and one no-op
+    response = admin.patch('/admin/orders/bulk', json={'orders': [
+        {'id': upi[0]['id'], 'version': upi[0]['version'], 'order_status': 'preparing'},
+        {'id': upi[1]['id'], 'version': upi[1]['version'], 'order_status': upi[1]['order_status']},
+    ]})
+    assert response.get_json()['errors'] == []
+    _assert_view_current(admin)
+
+    # Reconcile
+    with app.app_context():
+        merchant_id = db.session.get(Order, upi[0]['id']).merchant_upi_id
+        statement = _statement(upi)
+    response = admin.post(
+        f'/admin/merchant/{merchant_id}/reconcile',
+        data={'file': (io.BytesIO(statement), 'statement.csv')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['summary']['matched'] == 2
+    assert {o['payment_status'] for o in _assert_view_current(admin)} == {'paid'}
@@ -0,0 +1,106 @@
+"""
+Repeat customers: looking up past orders and placing them again.
+"""
+from conftest import place_order
+
+NAME = 'Test Customer'
+PHONE = '9876543210'
+
+
+def _reorder(client, order_id, name=NAME, phone=PHONE):
+    return client.post('/order/reorder', json={
+        'order_id': order_id,
+        'payment_method': 'cash',
+        'customer_name': name,
+        'customer_phone': phone
+    })
+
+
+def test_customer_orders_newest_first(admin):
+    menu = admin.get('/menu').get_json()
+    first = place_order(admin, menu[0]['id'])
+    second = place_order(admin, menu[1]['id'], full_qty=0, half_qty=2)
+    place_order(admin, menu[0]['id'], phone='9000000000')
+
+    response = admin.get(f'/customer/orders?phone={PHONE}&name=test customer')
+    assert response.status_code == 200, response.get_json()
+    orders = response.get_json()
+    assert [o['id'] for o in orders] == [second['id'], first['id']]
+    assert orders[0]['items'] == [{
+        'menu_item_id': menu[1]['id'], 'menu_item_name': menu[1]['name'],
+        'full_qty': 0, 'half_qty': 2
+    }]
+    assert orders[0]['tracking_token']
+
+    limited = admin.get(f'/customer/orders?phone={PHONE}&name={NAME}&limit=1').get_json()
+    assert [o['id'] for o in limited] == [second['id']]
+
+
+def test_customer_orders_need_the_matching_name(admin):
+    menu = admin.get('/menu').get_json()
+    place_order(admin, menu[0]['id'])
+
+    assert admin.get(f'/customer/orders?phone={PHONE}').status_code == 400
+    assert admin.get(f'/customer/orders?phone={PHONE}&name=Someone Else').status_code == 404
+    assert admin.get(f'/customer/orders?phone={PHONE}&name={NAME}&limit=x').status_code == 400
+
+
+def test_reorder_places_the_order_again(admin):
+    menu = admin.get('/menu').get_json()
+    past = place_order(admin, menu[0]['id'], full_qty=2)
+
+    response = _reorder(admin, past['id'])
+    assert response.status_code == 201, response.get_json()
+    order = response.get_json()['order']
+    assert order['id'] != past['id']
+    assert order['total_amount'] == past['total_amount']
+    assert response.get_json()['skipped'] == []
+
+    # Ids sent as strings are accepted too
+    assert _reorder(admin, str(past['id'])).status_code == 201
+
+
+def test_reorder_skips_unavailable_items(admin):
+    menu = admin.get('/menu').get_json()
+    response = admin.post('/order', json={
+        'items': [
+            {'menu_item_id': menu[0]['id'], 'full_qty': 1},
+            {'menu_item_id': menu[1]['id'], 'full_qty': 1},
+        ],
+        'payment_method': 'cash', 'customer_name': NAME, 'customer_phone': PHONE
+    })
+    past = response.get_json()['order']
+    admin.patch(f"/admin/menu/{menu[1]['id']}", json={'is_available': False})
+
+    response = _reorder(admin, past['id'])
+    assert response.status_code == 201, response.get_json()
+    assert [item['menu_item_id'] for item in response.get_json()['order']['items']] == [menu[0]['id']]
+    assert [item['menu_item_id'] for item in response.get_json()['skipped']] == [menu[1]['id']]
+
+
+def test_reorder_rejects_other_customers_and_bad_ids(admin):
+    menu = admin.get('/menu').get_json()
+    past = place_order(admin, menu[0]['id'])
+
+    assert _reorder(admin, past['id'], name='Someone Else').status_code == 404
+    assert _reorder(admin, past['id'], phone='9000000000').status_code == 404
+    for order_id in ('abc', [past['id']], {'id': past['id']}, True, 2 ** 40, -1):
+        assert _reorder(admin, order_id).status_code == 400, order_id
+
+
+def test_menu_item_ids_are_validated(admin):
+    menu = admin.get('/menu').get_json()
+    assert place_order(admin, str(menu[0]['id']))['items'][0]['menu_item_id'] == menu[0]['id']
+
+    for menu_item_id in ('abc', [menu[0]['id']], {'id': 1}, 2 ** 40):
+        response = admin.post('/order', json={
+            'items': [{'menu_item_id': menu_item_id, 'full_qty': 1}],
+            'payment_method': 'cash', 'customer_name': NAME, 'customer_phone': PHONE
+        })
+        assert response.status_code == 400, menu_item_id
+
+    response = admin.post('/order', json={
+        'items': ['not an item'],
+        'payment_method': 'cash', 'customer_name': NAME, 'customer_phone': PHONE
+    })
+    assert response.status_code == 400
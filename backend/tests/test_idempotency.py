@@ -0,0 +1,84 @@
+"""
+Idempotency-Key handling on customer POST endpoints.
+"""
+from datetime import datetime, timedelta
+
+from models import db, IdempotencyKey, Order
+
+
+def _order_body(menu_item_id, full_qty=1):
+    return {
+        'items': [{'menu_item_id': menu_item_id, 'full_qty': full_qty}],
+        'payment_method': 'cash',
+        'customer_name': 'Test Customer',
+        'customer_phone': '9876543210'
+    }
+
+
+def _post_order(client, body, key='checkout-1'):
+    return client.post('/order', json=body, headers={'Idempotency-Key': key})
+
+
+def _order_count(app):
+    with app.app_context():
+        return Order.query.count()
+
+
+def test_retry_replays_the_first_response(app, admin):
+    body = _order_body(admin.get('/menu').get_json()[0]['id'])
+
+    first = _post_order(admin, body)
+    assert first.status_code == 201, first.get_json()
+    retry = _post_order(admin, body)
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert _order_count(app) == 1
+
+
+def test_key_reused_with_a_different_body_is_rejected(app, admin):
+    menu_item_id = admin.get('/menu').get_json()[0]['id']
+    assert _post_order(admin, _order_body(menu_item_id)).status_code == 201
+
+    response = _post_order(admin, _order_body(menu_item_id, full_qty=2))
+    assert response.status_code == 422
+    assert _order_count(app) == 1
+
+
+def test_failed_responses_are_not_stored(app, admin):
+    body = _order_body(admin.get('/menu').get_json()[0]['id'])
+    admin.patch('/admin/status', json={'is_open': False})
+
+    closed = _post_order(admin, body)
+    assert closed.status_code == 400
+    with app.app_context():
+        assert IdempotencyKey.query.count() == 0
+
+    admin.patch('/admin/status', json={'is_open': True})
+    retry = _post_order(admin, body)
+    assert retry.status_code == 201, retry.get_json()
+    assert 'Idempotent-Replayed' not in retry.headers
+    assert _order_count(app) == 1
+
+
+def test_abandoned_key_can_be_claimed_again(app, admin):
+    body = _order_body(admin.get('/menu').get_json()[0]['id'])
+    assert _post_order(admin, body).status_code == 201
+
+    with app.app_context():
+        # As if the first request's worker was killed before it stored a response
+        started = datetime.utcnow() - timedelta(seconds=app.config['IDEMPOTENCY_LOCK_TIMEOUT'] - 5)
+        IdempotencyKey.query.update({'status_code': None, 'response_body': None, 'created_at': started})
+        db.session.commit()
+
+    assert _post_order(admin, body).status_code == 409
+
+    with app.app_context():
+        started -= timedelta(seconds=10)
+        IdempotencyKey.query.update({'created_at': started})
+        db.session.commit()
+
+    retry = _post_order(admin, body)
+    assert retry.status_code == 201, retry.get_json()
+    assert 'Idempotent-Replayed' not in retry.headers
+    assert _post_order(admin, body).headers['Idempotent-Replayed'] == 'true'
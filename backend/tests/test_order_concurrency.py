@@ -0,0 +1,195 @@
+"""
+Optimistic versioning of order writes under concurrent dashboards.
+"""
+import threading
+import time
+
+from active_orders import orders_counter
+from conftest import login, place_order
+from models import db, ChangeCounter, Order
+from order_tracking import RECHECK_INTERVAL
+
+THREADS = 4
+INCREMENTS = 10
+
+
+def test_concurrent_read_modify_write_loses_no_updates(app, admin):
+    menu = admin.get('/menu').get_json()
+    quantity = THREADS // 2 * INCREMENTS
+    order = place_order(admin, menu[0]['id'], full_qty=quantity, half_qty=quantity)
+    item_id = order['items'][0]['id']
+
+    applied = []
+    failures = []
+    lock = threading.Lock()
+
+    def dashboard(field):
+        # Each thread is a staff phone: read, add one plate, write back
+        client = login(app.test_client())
+        state = client.get('/admin/orders').get_json()[0]
+        try:
+            for _ in range(INCREMENTS):
+                while True:
+                    delivered = state['items'][0][field] + 1
+                    response = client.patch(f"/admin/order/{order['id']}", json={
+                        'version': state['version'],
+                        'items': [{'id': item_id, field: delivered}]
+                    })
+                    state = response.get_json()['order']
+                    if response.status_code == 200:
+                        with lock:
+                            applied.append((field, delivered))
+                        break
+                    assert response.status_code == 409, response.get_json()
+        except Exception as e:
+            failures.append(e)
+
+    threads = [
+        threading.Thread(target=dashboard, args=('delivered_full' if i % 2 else 'delivered_half',))
+        for i in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not failures, failures
+    final = admin.get('/admin/orders/delivered').get_json()
+    assert [o['id'] for o in final] == [order['id']]
+    item = final[0]['items'][0]
+    assert (item['delivered_full'], item['delivered_half']) == (quantity, quantity)
+
+    # Every accepted write set a distinct value and bumped the version once
+    assert len(applied) == THREADS * INCREMENTS
+    assert len(set(applied)) == len(applied)
+    assert final[0]['version'] == order['version'] + len(applied)
+
+
+def test_stale_version_returns_current_order(admin):
+    menu = admin.get('/menu').get_json()
+    order = place_order(admin, menu[0]['id'])
+
+    first = admin.patch(f"/admin/order/{order['id']}", json={
+        'version': order['version'], 'payment_status': 'paid'
+    })
+    assert first.status_code == 200
+
+    stale = admin.patch(f"/admin/order/{order['id']}", json={
+        'version': order['version'], 'payment_status': 'pending'
+    })
+    assert stale.status_code == 409
+    assert stale.get_json()['order']['payment_status'] == 'paid'
+    assert stale.get_json()['order']['version'] == order['version'] + 1
+
+
+def test_malformed_versions_are_rejected(admin):
+    menu = admin.get('/menu').get_json()
+    order = place_order(admin, menu[0]['id'])
+
+    for version in ('1', True, None):
+        response = admin.patch(f"/admin/order/{order['id']}", json={
+            'version': version, 'payment_status': 'paid'
+        })
+        assert response.status_code == 400, version
+
+    bulk = admin.patch('/admin/orders/bulk', json={'orders': [
+        {'id': order['id'], 'version': '1', 'payment_status': 'paid'}
+    ]})
+    assert bulk.get_json()['errors'] == [
+        {'index': 0, 'id': order['id'], 'error': 'version must be an integer'}
+    ]
+
+
+def test_updates_without_a_version_are_still_accepted(admin):
+    # Dashboards built before versioning send no version
+    menu = admin.get('/menu').get_json()
+    order = place_order(admin, menu[0]['id'])
+
+    response = admin.patch(f"/admin/order/{order['id']}", json={'payment_status': 'paid'})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['order']['version'] == order['version'] + 1
+
+    bulk = admin.patch('/admin/orders/bulk', json={'orders': [
+        {'id': order['id'], 'order_status': 'preparing'}
+    ]})
+    assert bulk.get_json()['errors'] == []
+
+
+def test_tracking_version_is_accepted_by_updates(app, admin):
+    menu = admin.get('/menu').get_json()
+    response = admin.post('/order', json={
+        'items': [{'menu_item_id': menu[0]['id'], 'full_qty': 1}],
+        'payment_method': 'cash',
+        'customer_name': 'Test Customer',
+        'customer_phone': '9876543210'
+    })
+    order = response.get_json()['order']
+    token = response.get_json()['tracking_token']
+
+    tracked = app.test_client().get(f"/order/{order['id']}/track?token={token}").get_json()
+    update = admin.patch(f"/admin/order/{order['id']}", json={
+        'version': tracked['version'], 'order_status': 'preparing'
+    })
+    assert update.status_code == 200, update.get_json()
+
+    changed = app.test_client().get(
+        f"/order/{order['id']}/track?token={token}&version={tracked['version']}&wait=1"
+    ).get_json()
+    assert changed['changed'] is True
+    assert changed['version'] == tracked['version'] + 1
+
+
+def test_bulk_no_op_entries_keep_the_active_view_current(admin):
+    menu = admin.get('/menu').get_json()
+    first = place_order(admin, menu[0]['id'])
+    second = place_order(admin, menu[0]['id'])
+    admin.get('/admin/orders')  # load the in-memory view
+
+    response = admin.patch('/admin/orders/bulk', json={'orders': [
+        {'id': first['id'], 'version': first['version'], 'payment_status': first['payment_status']},
+        {'id': second['id'], 'version': second['version'], 'payment_status': 'paid'},
+    ]})
+    assert response.status_code == 200, response.get_json()
+    assert [entry['id'] for entry in response.get_json()['updated']] == [second['id']]
+
+    versions = {o['id']: o['version'] for o in admin.get('/admin/orders').get_json()}
+    assert versions == {o['id']: o['version'] for o in admin.get('/admin/orders?fields=id,version').get_json()}
+
+    # The dashboard's copy of the no-op order is still good enough to write with
+    retry = admin.patch(f"/admin/order/{first['id']}", json={
+        'version': versions[first['id']], 'order_status': 'preparing'
+    })
+    assert retry.status_code == 200, retry.get_json()
+
+
+def test_tracking_sees_writes_from_other_workers(app, admin):
+    menu = admin.get('/menu').get_json()
+    response = admin.post('/order', json={
+        'items': [{'menu_item_id': menu[0]['id'], 'full_qty': 1}],
+        'payment_method': 'cash',
+        'customer_name': 'Test Customer',
+        'customer_phone': '9876543210'
+    })
+    order = response.get_json()['order']
+    token = response.get_json()['tracking_token']
+
+    def other_worker():
+        # Commits and signals the counter, but cannot wake this process's waiters
+        time.sleep(0.5)
+        with app.app_context():
+            db.session.get(Order, order['id']).order_status = 'preparing'
+            db.session.commit()
+            ChangeCounter.signal(orders_counter(1))
+
+    writer = threading.Thread(target=other_worker)
+    writer.start()
+    started = time.monotonic()
+    tracked = app.test_client().get(
+        f"/order/{order['id']}/track?token={token}&version={order['version']}&wait=10"
+    ).get_json()
+    writer.join()
+
+    assert tracked['changed'] is True
+    assert tracked['order']['order_status'] == 'preparing'
+    # Noticed at the next counter check, not at the end of the wait
+    assert time.monotonic() - started < RECHECK_INTERVAL + 2
@@ -0,0 +1,75 @@
+"""
+Outlet routing and per-outlet databases.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from conftest import place_order
+
+
+@pytest.fixture
+def outlet_databases(tmp_path):
+    # SQLite outlet database next to whichever main database is under test
+    return {'campus': f'sqlite:///{tmp_path / "campus.db"}'}
+
+
+def _add_menu_item(client, prefix, name='Veg Maida Momos'):
+    response = client.post(f'{prefix}/admin/menu/add', json={'name': name})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['item']
+
+
+def test_outlet_database_keeps_its_own_orders(app, admin, outlet_databases):
+    item = _add_menu_item(admin, '/o/campus')
+    assert [i['id'] for i in admin.get('/o/campus/menu').get_json()] == [item['id']]
+
+    response = admin.post('/o/campus/order', json={
+        'items': [{'menu_item_id': item['id'], 'full_qty': 1}],
+        'payment_method': 'cash',
+        'customer_name': 'Test Customer',
+        'customer_phone': '9876543210'
+    })
+    assert response.status_code == 201, response.get_json()
+    order = response.get_json()['order']
+
+    assert [o['id'] for o in admin.get('/o/campus/admin/orders').get_json()] == [order['id']]
+    assert admin.get('/admin/orders').get_json() == []
+
+    engine = create_engine(outlet_databases['campus'])
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text('SELECT id FROM orders')).scalars().all() == [order['id']]
+    finally:
+        engine.dispose()
+
+
+def test_added_outlet_takes_orders(app, admin):
+    response = admin.post('/admin/outlets', json={'slug': 'mall', 'name': 'Mall'})
+    assert response.status_code == 201, response.get_json()
+
+    assert admin.get('/o/mall/status').get_json()['is_open'] is True
+    item = _add_menu_item(admin, '/o/mall')
+    response = admin.post('/o/mall/order', json={
+        'items': [{'menu_item_id': item['id'], 'full_qty': 1}],
+        'payment_method': 'cash',
+        'customer_name': 'Test Customer',
+        'customer_phone': '9876543210'
+    })
+    assert response.status_code == 201, response.get_json()
+    order = response.get_json()['order']
+    assert [o['id'] for o in admin.get('/o/mall/admin/orders').get_json()] == [order['id']]
+
+    # The default outlet's menu and orders are untouched
+    assert item['id'] not in [i['id'] for i in admin.get('/menu').get_json()]
+    assert admin.get('/admin/orders').get_json() == []
+
+
+def test_unknown_outlet_is_not_found(admin):
+    assert admin.get('/o/nowhere/menu').status_code == 404
+
+
+def test_default_outlet_serves_unprefixed_paths(admin):
+    menu = admin.get('/menu').get_json()
+    order = place_order(admin, menu[0]['id'])
+    assert admin.get('/o/main/admin/orders').get_json()[0]['id'] == order['id']
+    assert admin.get('/o/campus/admin/orders').get_json() == []
@@ -0,0 +1,71 @@
+"""
+Settlement statement reconciliation.
+"""
+import io
+from datetime import timedelta
+
+from models import db, Order, MerchantAccount
+from reconciliation import reconcile_statement
+
+
+def _upi_orders(admin, count):
+    menu = admin.get('/menu').get_json()
+    orders = []
+    for i in range(count):
+        # Distinct quantities give distinct amounts, so each line has one candidate
+        response = admin.post('/order', json={
+            'items': [{'menu_item_id': menu[0]['id'], 'full_qty': i + 1}],
+            'payment_method': 'upi',
+            'customer_name': 'Test Customer',
+            'customer_phone': '9876543210'
+        })
+        assert response.status_code == 201, response.get_json()
+        orders.append(response.get_json()['order'])
+    return orders
+
+
+def _statement(orders):
+    lines = ['Date,Amount,UTR']
+    for i, order in enumerate(orders):
+        # Statement times are local (IST); orders are stored in UTC
+        local = db.session.get(Order, order['id']).timestamp + timedelta(hours=5, minutes=35)
+        lines.append(f"{local:%Y-%m-%d %H:%M:%S},{order['total_amount']},UTR{i}")
+    return '\n'.join(lines).encode()
+
+
+class SettleWhileReading(io.BytesIO):
+    """Statement stream that settles an order before its first line is read"""
+
+    def __init__(self, data, order_id):
+        super().__init__(data)
+        self.order_id = order_id
+
+    def read1(self, *args):
+        if self.order_id is not None:
+            with db.engine.begin() as conn:
+                conn.execute(Order.__table__.update()
+                             .where(Order.__table__.c.id == self.order_id)
+                             .values(payment_status='paid'))
+            self.order_id = None
+        return super().read1(*args)
+
+
+def test_concurrently_settled_orders_are_not_reported_matched(app, admin):
+    orders = _upi_orders(admin, 2)
+    with app.test_request_context():
+        merchant = db.session.get(MerchantAccount, db.session.get(Order, orders[0]['id']).merchant_upi_id)
+        stream = SettleWhileReading(_statement(orders), orders[0]['id'])
+
+        report, matched_ids = reconcile_statement(
+            stream, merchant, Order.query, timedelta(minutes=30),
+            timedelta(minutes=330), batch_size=500, counter='orders:1'
+        )
+
+        assert matched_ids == [orders[1]['id']]
+        assert [entry['order_id'] for entry in report['matched']] == [orders[1]['id']]
+        assert report['unmatched'] == [{
+            'line': 2, 'reference': 'UTR0', 'amount': orders[0]['total_amount'],
+            'order_id': orders[0]['id'], 'reason': 'Order is no longer pending'
+        }]
+        assert report['summary'] == {'matched': 1, 'ambiguous': 0, 'unmatched': 1}
+        assert db.session.get(Order, orders[1]['id']).version == orders[1]['version'] + 1
@@ -0,0 +1,76 @@
+"""
+Wait-time estimation.
+"""
+from datetime import datetime, timedelta
+
+from conftest import place_order
+from models import db, OrderItem
+from wait_time import wait_times, DEFAULT_MINUTES_PER_PLATE, RATE_WINDOW
+
+
+def _deliver(admin, order, delivered_full):
+    response = admin.patch(f"/admin/order/{order['id']}", json={
+        'version': order['version'],
+        'items': [{'id': order['items'][0]['id'], 'delivered_full': delivered_full}]
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['order']
+
+
+def _estimate(status):
+    return {key: status[key] for key in ('queue_length', 'estimated_wait_minutes')}
+
+
+def test_estimates_in_status_and_order_responses(app, admin):
+    # Too few deliveries to learn a rate, so every plate takes the default
+    minutes = DEFAULT_MINUTES_PER_PLATE
+    menu = admin.get('/menu').get_json()
+    assert _estimate(admin.get('/status').get_json()) == {'queue_length': 0, 'estimated_wait_minutes': 0}
+
+    response = admin.post('/order', json={
+        'items': [{'menu_item_id': menu[0]['id'], 'full_qty': 2}],
+        'payment_method': 'cash',
+        'customer_name': 'Test Customer',
+        'customer_phone': '9876543210'
+    })
+    first = response.get_json()['order']
+    token = response.get_json()['tracking_token']
+    assert (first['queue_position'], first['estimated_wait_minutes']) == (1, 2 * minutes)
+
+    second = place_order(admin, menu[0]['id'], full_qty=0, half_qty=1)
+    assert (second['queue_position'], second['estimated_wait_minutes']) == (2, 3 * minutes)
+    assert _estimate(admin.get('/status').get_json()) == {'queue_length': 2, 'estimated_wait_minutes': 3 * minutes}
+
+    served = _deliver(admin, first, 2)
+    assert (served['queue_position'], served['estimated_wait_minutes']) == (None, 0)
+    assert _estimate(admin.get('/status').get_json()) == {'queue_length': 1, 'estimated_wait_minutes': minutes}
+    tracked = admin.get(f"/order/{first['id']}/track?token={token}").get_json()['order']
+    assert (tracked['queue_position'], tracked['estimated_wait_minutes']) == (None, 0)
+
+    # The next order moves up once the one ahead of it is served
+    moved = admin.patch(f"/admin/order/{second['id']}", json={
+        'version': second['version'], 'payment_status': 'paid'
+    }).get_json()['order']
+    assert (moved['queue_position'], moved['estimated_wait_minutes']) == (1, minutes)
+
+
+def test_rebuild_matches_incremental_service_rate(app, admin):
+    menu = admin.get('/menu').get_json()
+    orders = [place_order(admin, menu[0]['id'], full_qty=4) for _ in range(4)]
+    orders[:3] = [_deliver(admin, order, 1) for order in orders[:3]]
+
+    with app.app_context():
+        # Age the first deliveries out of the rate window, then rebuild
+        OrderItem.query.update({'delivered_at': datetime.utcnow() - RATE_WINDOW - timedelta(minutes=5)})
+        db.session.commit()
+        estimator = wait_times(1)
+        estimator._load(datetime.utcnow())
+
+    for order in orders[:3]:
+        _deliver(admin, order, 3)
+
+    with app.app_context():
+        now = datetime.utcnow()
+        incremental = estimator._minutes_per_plate(now)
+        estimator._load(now)
+        assert estimator._minutes_per_plate(now) == incremental
@@ -1,7 +1,10 @@
 """
 Universal list of items that can be added to the menu.
 This is a master list of all possible items the stall can offer.
+
+The list below seeds the catalog_items table; lookups go through the table.
 """
+from models import db, CatalogItem
 
 UNIVERSAL_ITEMS = [
     # Normal Momos
@@ -25,14 +28,27 @@ UNIVERSAL_ITEMS = [
     {'name': 'Chicken Chilly Oil', 'category': 'Dim Sums', 'price_full': 300, 'price_half': 210}
 ]
 
+def seed_catalog():
+    """Insert any universal items missing from the catalog table"""
+    existing = {name for (name,) in db.session.query(CatalogItem.name)}
+    for item in UNIVERSAL_ITEMS:
+        if item['name'] not in existing:
+            db.session.add(CatalogItem(**item))
+    db.session.commit()
+
 def get_universal_items():
     """Get all universal items"""
-    return UNIVERSAL_ITEMS
+    items = CatalogItem.query.order_by(CatalogItem.category, CatalogItem.name).all()
+    return [item.to_dict() for item in items]
 
 def get_universal_item_by_name(name):
     """Get a universal item by name"""
-    for item in UNIVERSAL_ITEMS:
-        if item['name'] == name:
-            return item
-    return None
+    item = CatalogItem.query.filter_by(name=name).first()
+    return item.to_dict() if item else None
 
+def get_universal_items_by_name(names):
+    """Get catalog items for many names in one query, keyed by name"""
+    if not names:
+        return {}
+    items = CatalogItem.query.filter(CatalogItem.name.in_(names)).all()
+    return {item.name: item.to_dict() for item in items}
@@ -0,0 +1,181 @@
+"""
+Queue-based wait-time estimation.
+
+Active orders are served first-in first-out, so an order's wait is the number
+of plates still outstanding ahead of it (plus its own) divided by the rate at
+which the kitchen has recently been delivering plates. The queue and the
+service rate are kept in memory and updated on order writes; nothing here is
+recomputed per request.
+
+Only each item's latest delivery time is stored, so the service rate counts
+all plates delivered for an item at that item's last delivery. Rebuilds and
+incremental updates use the same rule, so the estimate does not jump when the
+cache is rebuilt.
+"""
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from models import Order, OrderItem
+
+# Deliveries older than this no longer count towards the service rate
+RATE_WINDOW = timedelta(minutes=30)
+# Used until enough deliveries have been seen to learn a rate
+DEFAULT_MINUTES_PER_PLATE = 2.0
+MIN_SAMPLE_PLATES = 5
+# Other workers write orders too, so the cache is rebuilt from the database
+# at most this often even when this process saw no writes
+REBUILD_INTERVAL = timedelta(seconds=60)
+
+
+def outstanding_plates(order):
+    """Number of Full/Half plates not yet delivered for an order"""
+    return sum(
+        max(item.full_qty - item.delivered_full, 0) + max(item.half_qty - item.delivered_half, 0)
+        for item in order.order_items
+    )
+
+
+class WaitTimeEstimator:
+    """Cached FIFO queue of one outlet's active orders plus a rolling delivery rate"""
+
+    def __init__(self, outlet_id):
+        self.outlet_id = outlet_id
+        self._lock = threading.Lock()
+        self._queue = OrderedDict()  # order_id -> outstanding plates, oldest first
+        self._deliveries = {}  # order item id -> (last delivered_at, plates delivered)
+        self._ahead = None  # order_id -> (position, plates ahead including own), rebuilt lazily
+        self._loaded_at = None
+
+    # ---- loading ----
+
+    def _load(self, now):
+        orders = (
+            Order.query
+            .filter(Order.outlet_id == self.outlet_id, Order.order_status != 'served')
+            .order_by(Order.timestamp, Order.id)
+            .all()
+        )
+        self._queue = OrderedDict()
+        for order in orders:
+            plates = outstanding_plates(order)
+            if plates > 0:
+                self._queue[order.id] = plates
+
+        self._deliveries = {}
+        recent = (
+            OrderItem.query
+            .join(Order)
+            .filter(Order.outlet_id == self.outlet_id, OrderItem.delivered_at >= now - RATE_WINDOW)
+            .all()
+        )
+        for item in recent:
+            self._record_delivery(item, now)
+
+        self._ahead = None
+        self._loaded_at = now
+
+    def _ensure_loaded(self, now):
+        if self._loaded_at is None or now - self._loaded_at > REBUILD_INTERVAL:
+            self._load(now)
+            return True
+        return False
+
+    def _record_delivery(self, item, now):
+        plates = item.delivered_full + item.delivered_half
+        if item.delivered_at is not None and item.delivered_at >= now - RATE_WINDOW and plates > 0:
+            self._deliveries[item.id] = (item.delivered_at, plates)
+        else:
+            self._deliveries.pop(item.id, None)
+
+    # ---- write hooks ----
+
+    def order_written(self, order, now=None):
+        """Update the cached queue after an order was created or updated"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            if self._ensure_loaded(now):
+                # A fresh load already reflects this committed write
+                return
+            plates = 0 if order.order_status == 'served' else outstanding_plates(order)
+            if plates > 0:
+                self._queue[order.id] = plates
+            else:
+                self._queue.pop(order.id, None)
+            for item in order.order_items:
+                self._record_delivery(item, now)
+            self._ahead = None
+
+    # ---- estimates ----
+
+    def _minutes_per_plate(self, now):
+        cutoff = now - RATE_WINDOW
+        self._deliveries = {
+            item_id: delivery for item_id, delivery in self._deliveries.items()
+            if delivery[0] >= cutoff
+        }
+
+        plates = sum(count for _, count in self._deliveries.values())
+        if plates < MIN_SAMPLE_PLATES:
+            return DEFAULT_MINUTES_PER_PLATE
+
+        oldest = min(delivered_at for delivered_at, _ in self._deliveries.values())
+        span = (now - oldest).total_seconds() / 60
+        span = max(span, RATE_WINDOW.total_seconds() / 60 / 6)
+        return span / plates
+
+    def _plates_ahead(self):
+        if self._ahead is None:
+            running = 0
+            self._ahead = {}
+            for position, (order_id, plates) in enumerate(self._queue.items(), start=1):
+                running += plates
+                self._ahead[order_id] = (position, running)
+        return self._ahead
+
+    def estimate_for_order(self, order_id, now=None):
+        """Queue position and estimated minutes until an order is fully served"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._ensure_loaded(now)
+            ahead = self._plates_ahead()
+            if order_id not in ahead:
+                return {'queue_position': None, 'estimated_wait_minutes': 0}
+
+            position, plates = ahead[order_id]
+            minutes = plates * self._minutes_per_plate(now)
+            return {
+                'queue_position': position,
+                'estimated_wait_minutes': math.ceil(minutes)
+            }
+
+    def estimate_for_new_order(self, now=None):
+        """Queue length and estimated minutes before a new order would be started"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._ensure_loaded(now)
+            total = sum(self._queue.values())
+            return {
+                'queue_length': len(self._queue),
+                'estimated_wait_minutes': math.ceil(total * self._minutes_per_plate(now))
+            }
+
+
+_estimators = {}
+_estimators_lock = threading.Lock()
+
+
+def wait_times(outlet_id):
+    """Wait-time estimator for an outlet"""
+    with _estimators_lock:
+        if outlet_id not in _estimators:
+            _estimators[outlet_id] = WaitTimeEstimator(outlet_id)
+        return _estimators[outlet_id]
+
+
+def with_wait_estimate(order):
+    """Serialize an order together with its wait-time estimate"""
+    data = order.to_dict()
+    data.update(wait_times(order.outlet_id).estimate_for_order(order.id))
+    return data
@@ -3,11 +3,12 @@ import { BrowserRouter as Router, Routes, Route, Link, useLocation } from 'react
 import { CartProvider } from './contexts/CartContext';
 import CustomerPortal from './components/CustomerPortal';
 import AdminDashboard from './components/AdminDashboard';
+import { OUTLET_PREFIX } from './utils/api';
 
 function App() {
   return (
     <CartProvider>
-      <Router>
+      <Router basename={OUTLET_PREFIX || undefined}>
         <Routes>
           <Route path="/" element={<CustomerPortal />} />
           <Route path="/admin" element={<AdminDashboard />} />
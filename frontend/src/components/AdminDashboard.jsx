@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { adminAPI } from '../utils/api';
+import { adminAPI, API_BASE_URL } from '../utils/api';
 import OrderCard from './OrderCard';
 import MerchantManager from './MerchantManager';
 import MenuManager from './MenuManager';
@@ -56,9 +56,7 @@ export default function AdminDashboard() {
 
       // Get status via public API
       try {
-        // In production, use relative path ('') so requests go to same domain as backend
-        const apiBase = import.meta.env.VITE_API_URL || (import.meta.env.DEV ? '/api' : '');
-        const statusResponse = await fetch(`${apiBase}/status`, {
+        const statusResponse = await fetch(`${API_BASE_URL}/status`, {
           credentials: 'include',
         });
         const statusData = await statusResponse.json();
@@ -82,6 +80,7 @@ export default function AdminDashboard() {
     } catch (error) {
       console.error('Error updating order:', error);
       alert('Failed to update order: ' + (error.message || 'Unknown error'));
+      await loadData(); // Show the order as it is now, e.g. after someone else changed it
     }
   };
 
@@ -158,9 +157,7 @@ export default function AdminDashboard() {
               <button
                 onClick={async () => {
                   try {
-                    // In production, use relative path ('') so requests go to same domain as backend
-                    const apiBase = import.meta.env.VITE_API_URL || (import.meta.env.DEV ? '/api' : '');
-                    const res = await fetch(`${apiBase}/admin/export-db`, {
+                    const res = await fetch(`${API_BASE_URL}/admin/export-db`, {
                       credentials: 'include',
                     });
                     if (!res.ok) throw new Error('Failed to export database');
@@ -23,6 +23,7 @@ export default function OrderCard({ order, onUpdate, readOnly = false }) {
       const newStatus = order.payment_status === 'paid' ? 'pending' : 'paid';
       await onUpdate(order.id, {
         payment_status: newStatus,
+        version: order.version,
       });
     } catch (error) {
       console.error('Error updating payment status:', error);
@@ -42,6 +43,8 @@ export default function OrderCard({ order, onUpdate, readOnly = false }) {
         id: itemId,
         [`delivered_${type}`]: checked ? item[`${type}_qty`] : 0,
       }],
+      // Rejected (409) if another device changed the order since we loaded it
+      version: order.version,
     };
 
     setUpdating(true);
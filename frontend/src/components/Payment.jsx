@@ -1,6 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useCart } from '../contexts/CartContext';
-import { publicAPI } from '../utils/api';
+import { publicAPI, newIdempotencyKey } from '../utils/api';
 import { openUPIPayment } from '../utils/upi';
 
 export default function Payment({ onBack, onSuccess, customerName, customerPhone }) {
@@ -13,6 +13,8 @@ export default function Payment({ onBack, onSuccess, customerName, customerPhone
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [upiPaid, setUpiPaid] = useState(false);
+  // One key per checkout, so retrying after a timeout never places a second order
+  const idempotencyKey = useRef(newIdempotencyKey());
 
   useEffect(() => {
     // Calculate approximate total for display
@@ -52,7 +54,7 @@ export default function Payment({ onBack, onSuccess, customerName, customerPhone
         customer_phone: customerPhone,
       };
 
-      const response = await publicAPI.createOrder(orderData);
+      await publicAPI.createOrder(orderData, idempotencyKey.current);
       onSuccess();
     } catch (error) {
       console.error('Error creating order:', error);
@@ -75,7 +77,7 @@ export default function Payment({ onBack, onSuccess, customerName, customerPhone
         customer_phone: customerPhone,
       };
 
-      const response = await publicAPI.createOrder(orderData);
+      const response = await publicAPI.createOrder(orderData, idempotencyKey.current);
       const order = response.order;
       
       setOrderId(order.id);
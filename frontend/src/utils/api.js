@@ -1,6 +1,9 @@
+// Pages opened under /o/<slug> talk to that outlet, so keep the prefix on every call
+export const OUTLET_PREFIX = (window.location.pathname.match(/^\/o\/[a-z0-9-]+/) || [''])[0];
+
 // Use proxy in development, or direct URL
 // In production, use relative path ('') so requests go to same domain as backend
-const API_BASE_URL = import.meta.env.VITE_API_URL || (import.meta.env.DEV ? '/api' : '');
+export const API_BASE_URL = (import.meta.env.VITE_API_URL || (import.meta.env.DEV ? '/api' : '')) + OUTLET_PREFIX;
 
 /**
  * Make API request with error handling
@@ -8,12 +11,12 @@ const API_BASE_URL = import.meta.env.VITE_API_URL || (import.meta.env.DEV ? '/ap
 async function apiRequest(endpoint, options = {}) {
   const url = `${API_BASE_URL}${endpoint}`;
   const config = {
+    credentials: 'include', // Include cookies for session
+    ...options,
     headers: {
       'Content-Type': 'application/json',
       ...options.headers,
     },
-    credentials: 'include', // Include cookies for session
-    ...options,
   };
 
   try {
@@ -31,12 +34,24 @@ async function apiRequest(endpoint, options = {}) {
   }
 }
 
+/**
+ * New Idempotency-Key for one checkout; retries of that checkout reuse it
+ */
+export function newIdempotencyKey() {
+  if (window.crypto?.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  // randomUUID needs a secure context; plain-http LAN deployments fall back to this
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+}
+
 // Public API endpoints
 export const publicAPI = {
   getStatus: () => apiRequest('/status'),
   getMenu: () => apiRequest('/menu'),
-  createOrder: (orderData) => apiRequest('/order', {
+  createOrder: (orderData, idempotencyKey) => apiRequest('/order', {
     method: 'POST',
+    headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
     body: JSON.stringify(orderData),
   }),
   confirmPayment: (orderId) => apiRequest('/payment/confirm', {